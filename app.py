@@ -3,9 +3,17 @@ Flask Web Application for DuckDuckGo Scraper
 A modern web UI for the scraper with image viewing capabilities
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from scrape import DuckDuckGoScraper
+from flask import Flask, render_template, request, jsonify, send_from_directory, send_file
+from scrape import CircuitBreaker, DuckDuckGoScraper, RateLimiter, SEARCH_KINDS, is_partial, task_wrapper
+from image_cache import ImageCache, UnsafeURLError
+import http_compression
+import metrics
+import profiling
+import tracing
+import watch
+import atexit
 import json
+import logging
 import os
 import time
 from datetime import datetime
@@ -17,16 +25,96 @@ app.config['UPLOAD_FOLDER'] = 'static/results'
 # Ensure upload folder exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# gzip/brotli/zstd responses; registered first so it runs after the hooks that rewrite bodies
+http_compression.init_app(app)
+
+# Prometheus metrics (/metrics)
+metrics.init_app(app)
+
+# Admin-only CPU profiling, enabled by setting PROFILE_ADMIN_TOKEN
+profiling.init_app(app, task_wrapper=task_wrapper)
+
+# Request tracing, enabled with TRACE_EXPORT=file:<path> or otlp:<collector URL>
+tracer = tracing.configure_from_env()
+if tracer is not None:
+    tracing.init_app(app, tracer)
+
+# Upper bound in seconds for a deep scrape; clients may ask for less with time_budget
+DEEP_SCRAPE_BUDGET = float(os.environ.get('DEEP_SCRAPE_BUDGET', 20))
+# Smallest time_budget honored, so 0 or a negative value still gives fetches a chance
+MIN_DEEP_SCRAPE_BUDGET = 0.5
+# Hedge deep-scrape fetches slower than this percentile of recent fetches (unset: off)
+HEDGE_PERCENTILE = float(os.environ['HEDGE_PERCENTILE']) if os.environ.get('HEDGE_PERCENTILE') else None
+HEDGE_BUDGET = float(os.environ.get('HEDGE_BUDGET', 0.2))
+# Largest page_size for /api/search/page; each page can grow the upstream request to twice its size
+MAX_PAGE_SIZE = int(os.environ.get('MAX_PAGE_SIZE', 100))
+
 # Initialize scraper
 scraper = None
 
+def get_link_graph():
+    """Link graph of deep-scraped pages, kept in LINK_GRAPH_FILE (None when unset)"""
+    path = os.environ.get('LINK_GRAPH_FILE')
+    if not path:
+        return None
+    # numpy is only needed when the link graph is enabled
+    from linkgraph import LinkGraph
+    graph = LinkGraph(path)
+    atexit.register(graph.maybe_save, True)
+    return graph
+
 def get_scraper():
     """Get or create scraper instance"""
     global scraper
     if scraper is None:
-        scraper = DuckDuckGoScraper()
+        # Optional cap on DDGS calls per second, shared by all requests
+        rate_limit = float(os.environ.get('DDGS_RATE_LIMIT', 0))
+        scraper = DuckDuckGoScraper(
+            parse_workers=int(os.environ.get('PARSE_WORKERS', 0)),
+            max_parse_bytes=int(os.environ.get('MAX_PARSE_BYTES', 5 * 1024 * 1024)),
+            rate_limiter=RateLimiter(rate_limit, burst=int(os.environ.get('DDGS_RATE_BURST', 4))) if rate_limit > 0 else None,
+            circuit_breaker=CircuitBreaker(
+                failure_threshold=int(os.environ.get('CIRCUIT_FAILURES', 5)),
+                reset_timeout=float(os.environ.get('CIRCUIT_RESET', 30))
+            ),
+            http2=os.environ.get('FETCH_HTTP2', '') in ('1', 'true'),
+            link_graph=get_link_graph()
+        )
+        scraper.add_listener(metrics.MetricsListener())
+        if tracer is not None:
+            scraper.add_listener(tracing.TracingListener(tracer))
     return scraper
 
+# Thumbnail proxy cache, bounded by IMAGE_CACHE_BYTES
+image_cache = ImageCache(
+    os.environ.get('IMAGE_CACHE_DIR', 'static/image_cache'),
+    max_bytes=int(os.environ.get('IMAGE_CACHE_BYTES', 200 * 1024 * 1024))
+)
+
+# Watched queries, persisted to WATCH_FILE
+watch_store = None
+watch_scheduler = None
+# Run due watches in a background thread. Every process that does re-runs every
+# watch and rewrites WATCH_FILE, so enable it in exactly one (not per gunicorn worker).
+WATCH_SCHEDULER = os.environ.get('WATCH_SCHEDULER', '') in ('1', 'true')
+
+def get_watch_scheduler():
+    """Get or create the watch scheduler; its thread only runs with WATCH_SCHEDULER=1"""
+    global watch_store, watch_scheduler
+    if watch_scheduler is None:
+        watch_store = watch.WatchStore(os.environ.get('WATCH_FILE', 'watches.json'))
+        watch_scheduler = watch.WatchScheduler(get_scraper(), watch_store)
+        if WATCH_SCHEDULER:
+            watch_scheduler.start()
+    return watch_scheduler
+
+# Persisted watches keep running after a restart. Under the debug reloader
+# only the serving child process (WERKZEUG_RUN_MAIN) runs them, and parse pool
+# workers, which re-import this script as __mp_main__, never do.
+if WATCH_SCHEDULER and __name__ != '__mp_main__' and \
+        (__name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    get_watch_scheduler()
+
 @app.route('/')
 def index():
     """Main page"""
@@ -42,21 +130,44 @@ def api_search():
         region = data.get('region', 'us-en')
         deep_scrape = data.get('deep_scrape', False)
         max_pages = int(data.get('max_pages', 3)) if deep_scrape else 0
+        extract = data.get('extract', 'full')
+        time_budget = data.get('time_budget')
+        time_budget = DEEP_SCRAPE_BUDGET if time_budget is None else \
+            min(max(float(time_budget), MIN_DEEP_SCRAPE_BUDGET), DEEP_SCRAPE_BUDGET)
+        rerank = bool(data.get('rerank', False))
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
+        if extract not in ('full', 'main', 'head'):
+            return jsonify({'error': "extract must be 'full', 'main' or 'head'"}), 400
         
         scraper = get_scraper()
-        results = scraper.search(query, max_results=max_results, region=region)
+        # With a deep scrape, re-rank once the page text is available
+        results = scraper.search(query, max_results=max_results, region=region,
+                                 rerank=rerank and not deep_scrape)
         
-        if deep_scrape and results:
-            results = scraper.enhance_results_with_page_content(results, max_pages=max_pages)
-        
-        return jsonify({
+        response = {
             'success': True,
             'results': results,
             'count': len(results)
-        })
+        }
+        
+        if deep_scrape and results:
+            results = scraper.enhance_results_with_page_content(results, max_pages=max_pages,
+                                                                extract=extract,
+                                                                time_budget=time_budget,
+                                                                hedge_percentile=HEDGE_PERCENTILE,
+                                                                hedge_budget=HEDGE_BUDGET,
+                                                                rerank_query=query if rerank else None)
+            response['results'] = results
+            response['partial'] = is_partial(results)
+            if scraper.link_graph is not None:
+                scraper.link_graph.maybe_save()
+        
+        return jsonify(response)
+    except ImportError as e:
+        # rerank needs numpy and scipy, which a minimal install may lack
+        return jsonify({'error': f"Missing optional dependency: {e.name or e}"}), 501
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -67,12 +178,13 @@ def api_search_images():
         data = request.json
         query = data.get('query', '')
         max_results = int(data.get('max_results', 10))
+        probe = bool(data.get('probe', False))
         
         if not query:
             return jsonify({'error': 'Query is required'}), 400
         
         scraper = get_scraper()
-        results = scraper.search_images(query, max_results=max_results)
+        results = scraper.search_images(query, max_results=max_results, probe=probe)
         
         return jsonify({
             'success': True,
@@ -128,6 +240,231 @@ def api_search_videos():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/search/all', methods=['POST'])
+def api_search_all():
+    """Run text, news, videos and images searches for one query concurrently"""
+    try:
+        data = request.json
+        query = data.get('query', '')
+        max_results = int(data.get('max_results', 10))
+        region = data.get('region', 'us-en')
+        kinds = data.get('types') or list(SEARCH_KINDS)
+        
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        if any(kind not in SEARCH_KINDS for kind in kinds):
+            return jsonify({'error': 'Invalid search type'}), 400
+        
+        scraper = get_scraper()
+        response = scraper.search_all(query, max_results=max_results, region=region, kinds=kinds)
+        
+        return jsonify({
+            'success': True,
+            'results': response['results'],
+            'count': sum(len(results) for results in response['results'].values()),
+            'timings': response['timings'],
+            'errors': response['errors']
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/search/page', methods=['POST'])
+def api_search_page():
+    """Paginated search API endpoint (cursor-based)"""
+    try:
+        data = request.json
+        search_type = data.get('type', 'text')
+        query = data.get('query', '')
+        page_size = min(max(int(data.get('page_size', 10)), 1), MAX_PAGE_SIZE)
+        region = data.get('region', 'us-en')
+        cursor = data.get('cursor')
+        
+        if not query and not cursor:
+            return jsonify({'error': 'Query or cursor is required'}), 400
+        if search_type not in ('text', 'news', 'videos', 'images'):
+            return jsonify({'error': 'Invalid search type'}), 400
+        
+        scraper = get_scraper()
+        try:
+            page = scraper.search_page(search_type, query, page_size=page_size, region=region, cursor=cursor)
+        except KeyError:
+            return jsonify({'error': 'Cursor is invalid or has expired'}), 410
+        
+        return jsonify({
+            'success': True,
+            'results': page['results'],
+            'count': len(page['results']),
+            'offset': page['offset'],
+            'cursor': page['cursor']
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/image', methods=['GET'])
+def api_image():
+    """Image proxy: serves remote images from the local cache (?url=, ?size=thumb|medium|original)"""
+    try:
+        url = request.args.get('url', '')
+        size = request.args.get('size', 'thumb')
+        
+        if not url:
+            return jsonify({'error': 'url is required'}), 400
+        
+        try:
+            entry = image_cache.get(get_scraper().session, url, size)
+        except UnsafeURLError as e:
+            return jsonify({'error': str(e)}), 403
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Cached bytes never change for a given digest, so clients may keep them
+        response = send_file(entry['path'], mimetype=entry['content_type'], etag=entry['digest'],
+                             max_age=7 * 24 * 3600, conditional=True)
+        response.headers['Cache-Control'] = 'public, max-age=604800, immutable'
+        response.headers['X-Cache'] = 'HIT' if entry['cached'] else 'MISS'
+        # Never let a browser treat proxied bytes as anything but the declared image type
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['Content-Security-Policy'] = "default-src 'none'; sandbox"
+        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 502
+
+@app.route('/api/watch', methods=['POST'])
+def api_watch_add():
+    """Register a query to be re-run on an interval"""
+    try:
+        data = request.json
+        query = data.get('query', '')
+        search_type = data.get('type', 'news')
+        
+        if not query:
+            return jsonify({'error': 'Query is required'}), 400
+        if search_type not in ('text', 'news', 'videos', 'images'):
+            return jsonify({'error': 'Invalid search type'}), 400
+        
+        scheduler = get_watch_scheduler()
+        entry = scheduler.store.add(
+            query,
+            kind=search_type,
+            region=data.get('region', 'us-en'),
+            max_results=int(data.get('max_results', 20)),
+            interval=max(float(data.get('interval', 300)), 30)
+        )
+        
+        return jsonify({'success': True, 'watch': scheduler.store.summary(entry)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/watch', methods=['GET'])
+def api_watch_list():
+    """List registered watches"""
+    try:
+        store = get_watch_scheduler().store
+        # The scheduler thread updates watches; snapshot them under the store lock
+        with store.lock:
+            watches = [store.summary(entry) for entry in store.watches.values()]
+        return jsonify({'success': True, 'watches': watches, 'count': len(watches)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/watch/<watch_id>', methods=['DELETE'])
+def api_watch_remove(watch_id):
+    """Unregister a watch"""
+    try:
+        if not get_watch_scheduler().store.remove(watch_id):
+            return jsonify({'error': 'Watch not found'}), 404
+        return jsonify({'success': True})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/watch/<watch_id>/run', methods=['POST'])
+def api_watch_run(watch_id):
+    """Run a watch now and return its new or changed results"""
+    try:
+        scheduler = get_watch_scheduler()
+        entry = scheduler.store.get(watch_id)
+        if entry is None:
+            return jsonify({'error': 'Watch not found'}), 404
+        
+        changes = scheduler.run_watch(entry)
+        
+        return jsonify({
+            'success': True,
+            'changes': changes,
+            'count': len(changes),
+            'seq': entry['seq']
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/watch/<watch_id>/changes', methods=['GET'])
+def api_watch_changes(watch_id):
+    """Changes recorded for a watch after sequence number ?since="""
+    try:
+        store = get_watch_scheduler().store
+        since = int(request.args.get('since', 0))
+        # Read changes and seq together, so a concurrent remove can't split them
+        with store.lock:
+            try:
+                changes = store.changes_since(watch_id, since)
+            except KeyError:
+                return jsonify({'error': 'Watch not found'}), 404
+            seq = store.get(watch_id)['seq']
+        
+        return jsonify({
+            'success': True,
+            'changes': changes,
+            'count': len(changes),
+            'seq': seq
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/linkgraph', methods=['GET'])
+def api_linkgraph():
+    """Most central deep-scraped pages by PageRank (?limit=)"""
+    try:
+        graph = get_scraper().link_graph
+        if graph is None:
+            return jsonify({'error': 'Link graph is disabled; set LINK_GRAPH_FILE'}), 404
+        
+        return jsonify({
+            'success': True,
+            'nodes': len(graph),
+            'edges': graph.edge_count,
+            'top': graph.top(int(request.args.get('limit', 20)))
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/cluster', methods=['POST'])
+def api_cluster():
+    """Group results into labeled topics"""
+    try:
+        data = request.json
+        results = data.get('result_sets') or data.get('results')
+        query = data.get('query', '')
+        num_clusters = int(data['num_clusters']) if data.get('num_clusters') else None
+        
+        if not results and query:
+            results = get_scraper().search(query, max_results=int(data.get('max_results', 50)),
+                                           region=data.get('region', 'us-en'))
+        if not results:
+            return jsonify({'error': 'results, result_sets or query is required'}), 400
+        
+        clusters = get_scraper().cluster_results(results, num_clusters=num_clusters)
+        return jsonify({
+            'success': True,
+            'clusters': clusters,
+            'count': len(clusters),
+            'total': sum(cluster['size'] for cluster in clusters)
+        })
+    except ImportError as e:
+        # Clustering needs numpy and scipy, which a minimal install may lack
+        return jsonify({'error': f"Missing optional dependency: {e.name or e}"}), 501
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/save', methods=['POST'])
 def api_save():
     """Save results to file"""
@@ -152,6 +489,7 @@ def api_save():
         return jsonify({'error': str(e)}), 500
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
     print("Starting DuckDuckGo Scraper Web UI...")
     print("Open your browser and go to: http://localhost:5000")
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,79 @@
+"""
+Cold-start import benchmark
+
+Imports a module in fresh interpreters with `python -X importtime` and reports
+the median total import time plus the most expensive modules it pulled in.
+Interpreter start-up imports (site, encodings, ...) are excluded.
+
+Usage:
+    python benchmarks/bench_imports.py                                   # Netlify handler
+    python benchmarks/bench_imports.py --module app --path .
+    python benchmarks/bench_imports.py --module scrape --then "scrape.DuckDuckGoScraper()"
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NETLIFY_FUNCTION = os.path.join(ROOT, 'netlify', 'functions', 'search')
+
+
+def parse_importtime(stderr: str):
+    """Parse -X importtime output into (module, self_us, cumulative_us, depth) tuples"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_part, cumulative_part, name = line.split('|', 2)
+        self_us = int(self_part.split(':')[1])
+        cumulative_us = int(cumulative_part)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        rows.append((name.strip(), self_us, cumulative_us, depth))
+    return rows
+
+
+def measure(module: str, path: str, then: str = ''):
+    """Import the module once in a fresh interpreter; returns (total_us, rows)"""
+    baseline = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'pass'],
+                              cwd=path, capture_output=True, text=True)
+    startup = {row[0] for row in parse_importtime(baseline.stderr)}
+    
+    code = f"import {module}" + (f"; {then}" if then else '')
+    run = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                         cwd=path, capture_output=True, text=True)
+    if run.returncode != 0:
+        raise SystemExit(run.stderr.strip().splitlines()[-1])
+    rows = [row for row in parse_importtime(run.stderr) if row[0] not in startup]
+    total = sum(row[2] for row in rows if row[3] == 0)
+    return total, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start import time per module')
+    parser.add_argument('--module', default='handler', help='Module to import (default: handler)')
+    parser.add_argument('--path', default=NETLIFY_FUNCTION,
+                        help='Directory to import from (default: the Netlify function)')
+    parser.add_argument('--then', default='', help='Python statement to run after the import, '
+                                                   'e.g. "handler.get_scraper()"')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to start (default: 5)')
+    parser.add_argument('--top', type=int, default=15, help='Modules to list (default: 15)')
+    args = parser.parse_args()
+    
+    totals, rows = [], []
+    for _ in range(args.runs):
+        total, rows = measure(args.module, args.path, args.then)
+        totals.append(total)
+    
+    print(f"import {args.module}{'; ' + args.then if args.then else ''}")
+    print(f"  median total: {statistics.median(totals) / 1000:.1f} ms over {args.runs} runs "
+          f"(min {min(totals) / 1000:.1f}, max {max(totals) / 1000:.1f})\n")
+    print(f"{'cumulative ms':>14}{'self ms':>10}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f}{self_us / 1000:>10.1f}  {'  ' * depth}{name}")
+
+
+if __name__ == '__main__':
+    main()
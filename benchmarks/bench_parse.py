@@ -0,0 +1,115 @@
+"""
+Offline parsing benchmark for DuckDuckGoScraper.scrape_page_content
+
+Serves the bundled corpus from a local fixture server and reports, per page:
+end-to-end throughput (pages/s, MB/s), per-stage parse cost and peak memory.
+
+Usage:
+    python benchmarks/bench_parse.py
+    python benchmarks/bench_parse.py --repeat 20 --extract main --json
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fixture_server import CORPUS_DIR, FixtureServer
+from scrape import DuckDuckGoScraper, parse_page_content
+
+STAGES = ['parse', 'meta', 'headings', 'images', 'links', 'text']
+
+
+def corpus_pages(names=None):
+    """List corpus HTML files, optionally filtered by name"""
+    pages = sorted(f for f in os.listdir(CORPUS_DIR) if f.endswith('.html'))
+    if names:
+        pages = [p for p in pages if p in names or p[:-len('.html')] in names]
+    return pages
+
+
+def bench_page(scraper: DuckDuckGoScraper, server: FixtureServer, page: str,
+               repeat: int, extract: str) -> dict:
+    """Benchmark one corpus page"""
+    url = server.url(page)
+    with open(os.path.join(CORPUS_DIR, page), 'rb') as f:
+        body = f.read()
+    
+    # Warm up the connection pool and any lazy imports
+    result = scraper.scrape_page_content(url, extract=extract)
+    if 'error' in result:
+        raise RuntimeError(f"{page}: {result['error']}")
+    
+    # End-to-end: fetch from the fixture server + parse
+    started = time.perf_counter()
+    for _ in range(repeat):
+        scraper.scrape_page_content(url, extract=extract)
+    elapsed = time.perf_counter() - started
+    
+    # Per-stage cost on the raw body, without the network
+    timings = {}
+    for _ in range(repeat):
+        parse_page_content(url, body, extract=extract, timings=timings)
+    
+    # Peak memory of a single scrape
+    tracemalloc.start()
+    scraper.scrape_page_content(url, extract=extract)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    
+    return {
+        'page': page,
+        'bytes': len(body),
+        'repeat': repeat,
+        'pages_per_s': repeat / elapsed,
+        'mb_per_s': len(body) * repeat / elapsed / 1e6,
+        'stages_ms': {stage: timings.get(stage, 0.0) / repeat * 1000 for stage in STAGES},
+        'peak_mem_mb': peak / 1e6,
+        'text_chars': len(result.get('text_content', '')),
+        'links': len(result.get('links', [])),
+    }
+
+
+def print_report(rows):
+    """Print results as a fixed-width table"""
+    header = f"{'page':<18}{'KB':>8}{'pages/s':>10}{'MB/s':>8}"
+    header += ''.join(f"{stage + ' ms':>12}" for stage in STAGES)
+    header += f"{'peak MB':>10}{'text':>9}"
+    print(header)
+    print('-' * len(header))
+    for row in rows:
+        line = f"{row['page']:<18}{row['bytes'] / 1024:>8.0f}{row['pages_per_s']:>10.1f}{row['mb_per_s']:>8.2f}"
+        line += ''.join(f"{row['stages_ms'][stage]:>12.2f}" for stage in STAGES)
+        line += f"{row['peak_mem_mb']:>10.1f}{row['text_chars']:>9}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark scrape_page_content on the bundled corpus')
+    parser.add_argument('--repeat', type=int, default=10, help='Iterations per page (default: 10)')
+    parser.add_argument('--extract', choices=['full', 'main'], default='full',
+                        help='Text extraction mode (default: full)')
+    parser.add_argument('--pages', nargs='*', help='Only run these corpus pages')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = parser.parse_args()
+    
+    scraper = DuckDuckGoScraper()
+    rows = []
+    with FixtureServer() as server:
+        for page in corpus_pages(args.pages):
+            rows.append(bench_page(scraper, server, page, args.repeat, args.extract))
+    
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        print_report(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Regenerate the large pages of the benchmark corpus
+
+huge.html and many_links.html are generated deterministically so they can be
+rebuilt (or resized) without keeping a real site's page in the repository.
+image.png is the upstream image for the /api/image proxy in the load test.
+small.html and malformed.html are hand-written and are not touched.
+"""
+
+import os
+import random
+import struct
+import zlib
+
+CORPUS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = ('data search result page content python query engine index network '
+         'parser document server request response cache latency browser link '
+         'image video news article section table value report system model').split()
+
+
+def sentence(rng: random.Random, length: int = 18) -> str:
+    """Build a pseudo-random sentence from the word list"""
+    words = [rng.choice(WORDS) for _ in range(length)]
+    words.insert(length // 2, words.pop(length // 2) + ',')
+    return ' '.join(words).capitalize() + '.'
+
+
+def build_huge(sections: int = 400, seed: int = 1) -> str:
+    """A long article with headings, paragraphs, tables, images and a large nav"""
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+             '<title>Huge benchmark page</title>',
+             '<meta name="description" content="A very long generated page for parser benchmarks.">',
+             '<meta property="og:url" content="https://example.com/huge">',
+             '<script>' + 'var x = 1;' * 500 + '</script>',
+             '<style>' + '.c { margin: 0; }' * 500 + '</style></head><body>',
+             '<nav><ul>']
+    parts += [f'<li><a href="/category/{i}">Category {i}</a></li>' for i in range(300)]
+    parts.append('</ul></nav><main><article class="content">')
+    for i in range(sections):
+        parts.append(f'<h2>Section {i}</h2>')
+        for _ in range(4):
+            parts.append('<p>' + ' '.join(sentence(rng) for _ in range(4)) + '</p>')
+        parts.append(f'<img src="/img/{i}.jpg" alt="Figure {i}" title="Figure {i}">')
+        if i % 10 == 0:
+            rows = ''.join(f'<tr><td>{rng.randint(0, 9999)}</td><td>{sentence(rng, 6)}</td></tr>'
+                           for _ in range(20))
+            parts.append(f'<table>{rows}</table>')
+    parts.append('</article></main><footer>')
+    parts += [f'<a href="/footer/{i}">Footer link {i}</a>' for i in range(100)]
+    parts.append('</footer></body></html>')
+    return '\n'.join(parts)
+
+
+def build_many_links(links: int = 8000, seed: int = 2) -> str:
+    """A sitemap-style page that is almost entirely anchors"""
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">',
+             '<title>Sitemap</title></head><body><h1>Sitemap</h1><ul>']
+    for i in range(links):
+        host = rng.choice(('', 'https://example.com', 'https://other.example.org'))
+        parts.append(f'<li><a href="{host}/page/{i}?ref={rng.randint(0, 99)}">'
+                     f'{sentence(rng, 5)}</a></li>')
+    parts.append('</ul></body></html>')
+    return '\n'.join(parts)
+
+
+def build_png(width: int = 400, height: int = 300) -> bytes:
+    """An RGB PNG of flat color blocks, larger than the proxy's thumbnail size so it gets resized"""
+    # Each scanline starts with filter type 0 (none)
+    rows = b''.join(b'\x00' + bytes(channel for x in range(width)
+                                     for channel in (x * 10 // width * 25, y * 10 // height * 25, 128))
+                    for y in range(height))
+    
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(rows, 9))
+            + chunk(b'IEND', b''))
+
+
+def main():
+    """Write the generated pages next to this script"""
+    for name, builder in (('huge.html', build_huge), ('many_links.html', build_many_links)):
+        path = os.path.join(CORPUS_DIR, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(builder())
+        print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+    path = os.path.join(CORPUS_DIR, 'image.png')
+    with open(path, 'wb') as f:
+        f.write(build_png())
+    print(f"Wrote {path} ({os.path.getsize(path) / 1024:.0f} KB)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Stub DDGS backend for offline load tests
+
+FakeDDGS mimics the text/news/videos/images methods of ddgs.DDGS and returns
+deterministic result sets, with configurable latency and rate-limit errors.
+Result URLs point at pages of a local fixture site, so deep scrapes work too.
+
+Usage:
+    scraper = DuckDuckGoScraper(ddgs=FakeDDGS(base_url=server.base_url))
+"""
+
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrape import RatelimitException
+
+
+class FakeDDGS:
+    """Deterministic stand-in for ddgs.DDGS"""
+    
+    def __init__(self, base_url: str = 'http://127.0.0.1:8765', latency: float = 0.05,
+                 jitter: float = 0.0, ratelimit_rate: float = 0.0,
+                 pages: Optional[List[str]] = None, seed: int = 0):
+        """
+        Args:
+            base_url: Root URL of the fixture site used for result URLs
+            latency: Seconds each call sleeps before returning
+            jitter: Extra random latency, uniformly drawn from [0, jitter]
+            ratelimit_rate: Probability (0-1) that a call raises RatelimitException
+            pages: Fixture pages that result URLs cycle through
+            seed: Seed for the jitter / rate-limit random generator
+        """
+        self.base_url = base_url.rstrip('/')
+        self.latency = latency
+        self.jitter = jitter
+        self.ratelimit_rate = ratelimit_rate
+        self.pages = pages or ['small.html', 'malformed.html']
+        self.calls = {'text': 0, 'news': 0, 'videos': 0, 'images': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+    
+    def _simulate(self, kind: str):
+        """Count the call, sleep for the configured latency and maybe rate-limit"""
+        with self._lock:
+            self.calls[kind] += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            limited = self._random.random() < self.ratelimit_rate
+        time.sleep(delay)
+        if limited:
+            raise RatelimitException(f"{kind}: simulated rate limit")
+    
+    def _items(self, query: str, max_results: Optional[int]):
+        """Yield (index, stable id, fixture URL) for a query"""
+        for i in range(max_results or 10):
+            digest = hashlib.md5(f"{query}:{i}".encode('utf-8')).hexdigest()[:12]
+            page = self.pages[i % len(self.pages)]
+            yield i, digest, f"{self.base_url}/{page}?id={digest}"
+    
+    def text(self, query: str, region: str = 'us-en', max_results: Optional[int] = 10,
+             **kwargs) -> List[Dict]:
+        self._simulate('text')
+        return [{
+            'title': f"{query} result {i + 1}",
+            'href': url,
+            'body': f"Snippet {digest} for {query} ({region}), result number {i + 1}.",
+        } for i, digest, url in self._items(query, max_results)]
+    
+    def news(self, query: str, region: str = 'us-en', max_results: Optional[int] = 10,
+             **kwargs) -> List[Dict]:
+        self._simulate('news')
+        return [{
+            'date': f"2024-01-{i % 28 + 1:02d}T12:00:00+00:00",
+            'title': f"{query} news {i + 1}",
+            'body': f"News snippet {digest} about {query}.",
+            'url': url,
+            'image': f"{self.base_url}/img/{digest}.jpg",
+            'source': f"Source {i % 5}",
+        } for i, digest, url in self._items(query, max_results)]
+    
+    def videos(self, query: str, region: str = 'us-en', max_results: Optional[int] = 10,
+               **kwargs) -> List[Dict]:
+        self._simulate('videos')
+        return [{
+            'title': f"{query} video {i + 1}",
+            'content': url,
+            'url': url,
+            'description': f"Video {digest} about {query}.",
+            'duration': f"{i % 60}:{i % 60:02d}",
+            'publisher': 'FakeTube',
+            'published': '2024-01-01T00:00:00.0000000',
+            'images': {'large': f"{self.base_url}/img/{digest}.jpg"},
+        } for i, digest, url in self._items(query, max_results)]
+    
+    def images(self, query: str, region: str = 'us-en', max_results: Optional[int] = 10,
+               **kwargs) -> List[Dict]:
+        self._simulate('images')
+        return [{
+            'title': f"{query} image {i + 1}",
+            'image': f"{self.base_url}/img/{digest}.jpg",
+            'thumbnail': f"{self.base_url}/img/{digest}_thumb.jpg",
+            'url': url,
+            'height': 480 + i,
+            'width': 640 + i,
+            'source': 'Bing',
+        } for i, digest, url in self._items(query, max_results)]
@@ -0,0 +1,85 @@
+"""
+Local HTTP fixture server
+Serves a directory of saved pages so benchmarks and load tests never touch the network
+"""
+
+import functools
+import os
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not log every request to stderr"""
+    
+    def log_message(self, format, *args):
+        pass
+
+
+class FixtureServer:
+    """
+    Threaded static file server running in a background thread
+    
+    Usage:
+        with FixtureServer() as server:
+            scraper.scrape_page_content(server.url('small.html'))
+    """
+    
+    def __init__(self, directory: str = CORPUS_DIR, host: str = '127.0.0.1', port: int = 0,
+                 handler_class=QuietHandler):
+        """
+        Args:
+            directory: Directory to serve
+            host: Interface to bind
+            port: Port to bind (0 picks a free port)
+            handler_class: SimpleHTTPRequestHandler subclass used for requests
+        """
+        handler = functools.partial(handler_class, directory=directory)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+    
+    @property
+    def base_url(self) -> str:
+        """Root URL of the server, without a trailing slash"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def url(self, path: str) -> str:
+        """Absolute URL for a file under the served directory"""
+        return f"{self.base_url}/{path.lstrip('/')}"
+    
+    def start(self):
+        """Start serving in a daemon thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+    
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.start()
+    
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == '__main__':
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Serve the benchmark corpus over HTTP')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--directory', default=CORPUS_DIR)
+    args = parser.parse_args()
+    
+    server = FixtureServer(args.directory, port=args.port)
+    print(f"Serving {args.directory} at {server.base_url} (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
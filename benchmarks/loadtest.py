@@ -0,0 +1,221 @@
+"""
+Offline load test for the Flask API (app.py)
+
+Starts the app in-process with a FakeDDGS backend and a local fixture site for
+deep-scrape targets, drives concurrent traffic at every endpoint and reports
+throughput and latency percentiles. Use --target to load test an app that is
+already running instead (it then uses whatever backend that app was started with).
+
+Usage:
+    python benchmarks/loadtest.py --concurrency 16 --duration 30
+    python benchmarks/loadtest.py --ddgs-latency 0.3 --ratelimit-rate 0.05 --mix search=5,deep=1
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import quote
+
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_ddgs import FakeDDGS
+from fixture_server import FixtureServer
+
+# name -> (method, path, JSON payload); {fixtures} is replaced by the fixture site's URL
+ENDPOINTS = {
+    'index': ('GET', '/', None),
+    'search': ('POST', '/api/search', {'query': 'load test', 'max_results': 10}),
+    'deep': ('POST', '/api/search', {'query': 'load test deep', 'max_results': 5,
+                                     'deep_scrape': True, 'max_pages': 2}),
+    'images': ('POST', '/api/search/images', {'query': 'load test', 'max_results': 20}),
+    'news': ('POST', '/api/search/news', {'query': 'load test', 'max_results': 10}),
+    'videos': ('POST', '/api/search/videos', {'query': 'load test', 'max_results': 10}),
+    'all': ('POST', '/api/search/all', {'query': 'load test', 'max_results': 10}),
+    'page': ('POST', '/api/search/page', {'query': 'load test', 'page_size': 10}),
+    'image': ('GET', '/api/image?size=thumb&url={fixtures}/image.png', None),
+    'cluster': ('POST', '/api/cluster', {'query': 'load test', 'max_results': 30}),
+    'watch': ('GET', '/api/watch', None),
+    'linkgraph': ('GET', '/api/linkgraph?limit=20', None),
+    'save': ('POST', '/api/save', {'results': [{'title': 'x', 'url': 'http://example.com'}],
+                                   'filename': 'loadtest.json'}),
+    'metrics': ('GET', '/metrics', None),
+}
+
+DEFAULT_MIX = ('index=1,search=6,deep=1,images=2,news=2,videos=2,all=1,page=2,image=2,cluster=1,'
+               'watch=1,linkgraph=1,save=1,metrics=1')
+
+
+def parse_mix(spec: str) -> dict:
+    """Parse 'name=weight,...' into a dict of endpoint weights"""
+    mix = {}
+    for item in spec.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' (choose from {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def start_local_app(args):
+    """
+    Run app.py with a FakeDDGS backend in a background thread
+
+    Returns:
+        (base_url, fixtures_url, stop)
+    """
+    import logging
+    from werkzeug.serving import make_server
+    
+    # Keep watches and cached images out of the working tree; set before app reads them
+    state_dir = tempfile.mkdtemp(prefix='loadtest-')
+    os.environ['WATCH_FILE'] = os.path.join(state_dir, 'watches.json')
+    os.environ['IMAGE_CACHE_DIR'] = os.path.join(state_dir, 'image_cache')
+    
+    import app as app_module
+    import image_cache
+    from linkgraph import LinkGraph
+    from scrape import DuckDuckGoScraper
+    
+    fixtures = FixtureServer().start()
+    # The fixture site is on loopback, which the image proxy's SSRF guard refuses; pin fetches to it
+    image_cache.check_public_url = lambda url: '127.0.0.1'
+    fake = FakeDDGS(base_url=fixtures.base_url, latency=args.ddgs_latency, jitter=args.ddgs_jitter,
+                    ratelimit_rate=args.ratelimit_rate, seed=args.seed)
+    app_module.scraper = DuckDuckGoScraper(ddgs=fake, parse_workers=args.parse_workers,
+                                           link_graph=LinkGraph())
+    app_module.scraper.add_listener(app_module.metrics.MetricsListener())
+    app_module.app.config['UPLOAD_FOLDER'] = state_dir
+    
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', 0, app_module.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    
+    def stop():
+        server.shutdown()
+        fixtures.stop()
+    
+    return f"http://127.0.0.1:{server.server_port}", fixtures.base_url, stop
+
+
+def worker(base_url: str, fixtures_url: str, mix: dict, deadline: float, max_requests, counter, stats,
+           lock, seed: int):
+    """Send requests until the deadline or request budget is used up"""
+    rng = random.Random(seed)
+    names, weights = list(mix), list(mix.values())
+    session = requests.Session()
+    while time.perf_counter() < deadline:
+        with lock:
+            if max_requests is not None and counter[0] >= max_requests:
+                return
+            counter[0] += 1
+        name = rng.choices(names, weights)[0]
+        method, path, payload = ENDPOINTS[name]
+        path = path.replace('{fixtures}', quote(fixtures_url or '', safe=''))
+        started = time.perf_counter()
+        try:
+            response = session.request(method, base_url + path, json=payload, timeout=120)
+            ok = response.status_code < 400
+            if ok and response.headers.get('Content-Type', '').startswith('application/json'):
+                ok = response.json().get('success', True)
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            stats[name]['latencies'].append(elapsed)
+            if not ok:
+                stats[name]['errors'] += 1
+
+
+def print_report(stats: dict, wall: float):
+    """Print throughput and latency percentiles per endpoint and overall"""
+    header = f"{'endpoint':<10}{'requests':>10}{'errors':>8}{'req/s':>9}" \
+             f"{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+    print(header)
+    print('-' * len(header))
+    
+    def row(name, latencies, errors):
+        latencies = sorted(latencies)
+        print(f"{name:<10}{len(latencies):>10}{errors:>8}{len(latencies) / wall:>9.1f}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 90) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}{(latencies[-1] if latencies else 0) * 1000:>10.1f}")
+    
+    all_latencies, all_errors = [], 0
+    for name in sorted(stats):
+        row(name, stats[name]['latencies'], stats[name]['errors'])
+        all_latencies += stats[name]['latencies']
+        all_errors += stats[name]['errors']
+    print('-' * len(header))
+    row('total', all_latencies, all_errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline load test for the Flask API')
+    parser.add_argument('--target', help='Base URL of an already running app (default: start one in-process)')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients (default: 8)')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds to run (default: 10)')
+    parser.add_argument('--requests', type=int, help='Stop after this many requests')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f'Endpoint weights (default: {DEFAULT_MIX})')
+    parser.add_argument('--ddgs-latency', type=float, default=0.2, help='Fake DDGS latency in seconds')
+    parser.add_argument('--ddgs-jitter', type=float, default=0.1, help='Extra random fake DDGS latency')
+    parser.add_argument('--ratelimit-rate', type=float, default=0.0, help='Fake DDGS rate-limit probability')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parse process pool size (default: inline)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', action='store_true', help='Print raw per-endpoint stats as JSON')
+    args = parser.parse_args()
+    
+    mix = parse_mix(args.mix)
+    stop = None
+    if args.target:
+        base_url = args.target.rstrip('/')
+        # A separately started app has no fixture site to proxy images from
+        fixtures_url = None
+        mix = {name: weight for name, weight in mix.items() if '{fixtures}' not in ENDPOINTS[name][1]}
+    else:
+        base_url, fixtures_url, stop = start_local_app(args)
+    
+    stats = defaultdict(lambda: {'latencies': [], 'errors': 0})
+    lock = threading.Lock()
+    counter = [0]
+    started = time.perf_counter()
+    deadline = started + args.duration
+    threads = [threading.Thread(target=worker, args=(base_url, fixtures_url, mix, deadline, args.requests,
+                                                     counter, stats, lock, args.seed + i))
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    
+    if stop:
+        stop()
+    
+    if args.json:
+        print(json.dumps({'wall_seconds': wall, 'endpoints': stats}, indent=2))
+    else:
+        print(f"{counter[0]} requests from {args.concurrency} clients in {wall:.1f}s against {base_url}\n")
+        print_report(stats, wall)
+
+
+if __name__ == '__main__':
+    main()
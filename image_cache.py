@@ -0,0 +1,319 @@
+"""
+Image proxy cache for the DuckDuckGo Scraper web UI
+Fetches remote thumbnails once, stores them content-addressed on disk with
+size-based eviction, and optionally resizes them to fixed thumbnail sizes.
+
+Resizing needs Pillow (pip install Pillow); without it images are served
+at their original size.
+"""
+
+import hashlib
+import io
+import ipaddress
+import os
+import socket
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin, urlparse
+
+# Longest edge in pixels for each named size; None keeps the original
+SIZES = {'thumb': 320, 'medium': 800, 'original': None}
+
+# Raster formats the proxy will store and serve. SVG and anything else that
+# can carry script is refused, since images are served from the app's origin.
+ALLOWED_TYPES = frozenset({'image/jpeg', 'image/png', 'image/gif', 'image/webp', 'image/avif'})
+
+
+class UnsafeURLError(ValueError):
+    """Raised when a URL points at a non-public address or an unsupported scheme"""
+
+
+def check_public_url(url: str) -> str:
+    """
+    Refuse URLs that would let the proxy reach internal services
+
+    Only http(s) URLs whose host resolves exclusively to public addresses
+    are allowed.
+
+    Returns:
+        A checked address of the host; connect to it rather than resolving
+        the name again, which a rebinding DNS server could answer differently
+
+    Raises:
+        UnsafeURLError if the URL is not safe to fetch
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        raise UnsafeURLError(f"Unsupported URL: {url}")
+    try:
+        infos = socket.getaddrinfo(parsed.hostname, parsed.port or (443 if parsed.scheme == 'https' else 80),
+                                   proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise UnsafeURLError(f"Cannot resolve {parsed.hostname}: {e}")
+    addresses = [ipaddress.ip_address(info[4][0].split('%')[0]) for info in infos]
+    for address in addresses:
+        if not address.is_global or address.is_multicast:
+            raise UnsafeURLError(f"{parsed.hostname} resolves to a non-public address")
+    if not addresses:
+        raise UnsafeURLError(f"Cannot resolve {parsed.hostname}")
+    return str(addresses[0])
+
+
+def _pinned_session(session, address: str):
+    """
+    requests session with session's headers whose connections all go to address
+
+    The URL's host name is still used for the Host header, TLS SNI and
+    certificate checks; only the TCP connection skips DNS. Proxies from the
+    environment are ignored, since they would make their own lookup.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def pinned(base):
+        class PinnedConnection(base):
+            def _new_conn(self):
+                # host is derived from _dns_host; swap it only while the socket is opened
+                host, self._dns_host = self._dns_host, address
+                try:
+                    return super()._new_conn()
+                finally:
+                    self._dns_host = host
+        return PinnedConnection
+
+    pool_classes = {
+        'http': type('PinnedHTTPConnectionPool', (HTTPConnectionPool,), {'ConnectionCls': pinned(HTTPConnection)}),
+        'https': type('PinnedHTTPSConnectionPool', (HTTPSConnectionPool,), {'ConnectionCls': pinned(HTTPSConnection)}),
+    }
+
+    class PinnedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = pool_classes
+
+    pinned_session = requests.Session()
+    pinned_session.trust_env = False
+    pinned_session.headers.update(session.headers)
+    pinned_session.mount('http://', PinnedAdapter())
+    pinned_session.mount('https://', PinnedAdapter())
+    return pinned_session
+
+
+def _resize(content: bytes, max_edge: int) -> Tuple[bytes, Optional[str]]:
+    """
+    Shrink an image so its longest edge is at most max_edge
+
+    Returns:
+        (bytes, content type), or (content, None) if Pillow is not installed,
+        the image cannot be decoded, or it is already small enough
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return content, None
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            if max(image.size) <= max_edge or getattr(image, 'is_animated', False):
+                return content, None
+            image.thumbnail((max_edge, max_edge))
+            out = io.BytesIO()
+            if image.mode in ('RGBA', 'LA', 'P'):
+                image.save(out, format='PNG', optimize=True)
+                return out.getvalue(), 'image/png'
+            image.convert('RGB').save(out, format='JPEG', quality=82, optimize=True)
+            return out.getvalue(), 'image/jpeg'
+    except Exception:
+        return content, None
+
+
+class ImageCache:
+    """
+    Content-addressed on-disk image cache
+
+    Blobs are stored under their SHA-256, so identical images served from
+    different URLs are kept once. A small key file per (url, size) points at
+    the blob and its content type. When the blobs exceed max_bytes the least
+    recently used ones are removed together with the keys pointing at them.
+    """
+
+    def __init__(self, cache_dir: str = 'static/image_cache', max_bytes: int = 200 * 1024 * 1024,
+                 max_image_bytes: int = 10 * 1024 * 1024, timeout: float = 10, max_redirects: int = 3):
+        """
+        Args:
+            cache_dir: Directory for blobs and keys
+            max_bytes: Total size limit of stored blobs
+            max_image_bytes: Largest upstream image that will be downloaded
+            timeout: Upstream request timeout in seconds
+            max_redirects: Redirects followed (each target is checked again)
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_image_bytes = max_image_bytes
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        self._blob_dir = os.path.join(cache_dir, 'blobs')
+        self._key_dir = os.path.join(cache_dir, 'keys')
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        os.makedirs(self._blob_dir, exist_ok=True)
+        os.makedirs(self._key_dir, exist_ok=True)
+
+    def blob_path(self, digest: str) -> str:
+        return os.path.join(self._blob_dir, digest[:2], digest)
+
+    def _key_path(self, url: str, size: str) -> str:
+        key = hashlib.sha256(f"{size}\n{url}".encode('utf-8')).hexdigest()
+        return os.path.join(self._key_dir, key)
+
+    def lookup(self, url: str, size: str = 'thumb') -> Optional[Dict]:
+        """
+        Find a cached image without touching the network
+
+        Returns:
+            {'digest', 'content_type', 'path'} or None on a miss
+        """
+        try:
+            with open(self._key_path(url, size), 'r', encoding='utf-8') as f:
+                digest, content_type = f.read().split('\n', 1)
+        except (OSError, ValueError):
+            return None
+        path = self.blob_path(digest)
+        if content_type not in ALLOWED_TYPES:
+            return None
+        try:
+            # mtime doubles as the last-used time for eviction
+            os.utime(path)
+        except OSError:
+            # Blob was evicted; drop the dangling key
+            self._remove(self._key_path(url, size))
+            return None
+        return {'digest': digest, 'content_type': content_type, 'path': path}
+
+    def get(self, session, url: str, size: str = 'thumb') -> Dict:
+        """
+        Return a cached image, fetching and storing it on a miss
+
+        Args:
+            session: requests.Session used for the upstream fetch
+            url: Remote image URL
+            size: One of SIZES
+
+        Returns:
+            {'digest', 'content_type', 'path', 'cached'}
+
+        Raises:
+            UnsafeURLError, ValueError, or requests.RequestException
+        """
+        if size not in SIZES:
+            raise ValueError(f"Unknown size: {size}")
+        entry = self.lookup(url, size)
+        if entry is not None:
+            entry['cached'] = True
+            return entry
+
+        content, content_type = self._fetch(session, url)
+        if SIZES[size]:
+            resized, resized_type = _resize(content, SIZES[size])
+            if resized_type:
+                content, content_type = resized, resized_type
+
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.blob_path(digest)
+        stored = not os.path.exists(path)
+        if stored:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+        # Key goes in before accounting, so eviction can find and remove it with its blob
+        with open(self._key_path(url, size), 'w', encoding='utf-8') as f:
+            f.write(f"{digest}\n{content_type}")
+        if stored:
+            self._account(len(content))
+        return {'digest': digest, 'content_type': content_type, 'path': path, 'cached': False}
+
+    def _fetch(self, session, url: str) -> Tuple[bytes, str]:
+        """Download an image, re-checking every redirect target and capping its size"""
+        for _ in range(self.max_redirects + 1):
+            # Connect to the address that was checked, not to a fresh lookup of the name
+            pinned = _pinned_session(session, check_public_url(url))
+            try:
+                response = pinned.get(url, timeout=self.timeout, stream=True, allow_redirects=False)
+            except Exception:
+                pinned.close()
+                raise
+            try:
+                if response.is_redirect:
+                    url = urljoin(url, response.headers['Location'])
+                    continue
+                response.raise_for_status()
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                if content_type not in ALLOWED_TYPES:
+                    raise ValueError(f"Unsupported image type: {content_type or 'unknown content type'}")
+                if int(response.headers.get('Content-Length') or 0) > self.max_image_bytes:
+                    raise ValueError("Image too large")
+                chunks = []
+                received = 0
+                for chunk in response.iter_content(64 * 1024):
+                    received += len(chunk)
+                    if received > self.max_image_bytes:
+                        raise ValueError("Image too large")
+                    chunks.append(chunk)
+                return b''.join(chunks), content_type
+            finally:
+                response.close()
+                pinned.close()
+        raise ValueError("Too many redirects")
+
+    def _account(self, added: int):
+        """Track stored bytes and evict least recently used blobs past max_bytes"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._scan())
+            else:
+                self._total_bytes += added
+            if self._total_bytes <= self.max_bytes:
+                return
+            # Evict down to 90% so a full cache doesn't rescan on every store
+            target = self.max_bytes * 0.9
+            evicted = set()
+            for _, size, path in sorted(self._scan()):
+                if self._total_bytes <= target:
+                    break
+                if self._remove(path):
+                    self._total_bytes -= size
+                    evicted.add(os.path.basename(path))
+            if evicted:
+                self._remove_keys(evicted)
+    
+    def _remove_keys(self, digests):
+        """Delete the key files that point at the given blob digests"""
+        for entry in os.scandir(self._key_dir):
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    digest = f.read().split('\n', 1)[0]
+            except OSError:
+                continue
+            if digest in digests:
+                self._remove(entry.path)
+    
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def _scan(self):
+        """(mtime, size, path) for every stored blob"""
+        for shard in os.scandir(self._blob_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if not entry.name.endswith('.tmp'):
+                    stat = entry.stat()
+                    yield stat.st_mtime, stat.st_size, entry.path
@@ -0,0 +1,261 @@
+"""
+Link graph of scraped pages
+Keeps the resolved outlinks of every scraped page in a compact graph with
+integer node ids and array-backed adjacency, and scores pages with PageRank
+so future fetches can go to the most central pages first.
+
+Requires numpy (pip install numpy).
+"""
+
+import os
+import threading
+import time
+from array import array
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin
+
+import numpy as np
+
+
+def normalize_url(base: str, href: str) -> Optional[str]:
+    """
+    Resolve a link against the page it was found on
+
+    Returns:
+        Absolute http(s) URL without fragment and with a lower-case scheme
+        and host, or None for mailto:, javascript: and similar links
+    """
+    href = href.strip()
+    # Browsers drop tabs and newlines anywhere in a URL (WHATWG URL parsing)
+    if '\n' in href or '\r' in href or '\t' in href:
+        href = href.replace('\n', '').replace('\r', '').replace('\t', '')
+    # urljoin is by far the slowest step, and most links are already absolute
+    if not href.lower().startswith(('http://', 'https://')):
+        if href.startswith('#') or href.lower().startswith(('mailto:', 'javascript:', 'tel:', 'data:')):
+            return None
+        href = urljoin(base, href)
+    url = href.partition('#')[0]
+    scheme, separator, rest = url.partition('://')
+    scheme = scheme.lower()
+    host, slash, path = rest.partition('/')
+    if not separator or scheme not in ('http', 'https') or not host:
+        return None
+    return f"{scheme}://{host.lower()}{slash}{path}"
+
+
+class LinkGraph:
+    """
+    Directed page graph with PageRank scoring
+
+    Nodes are URLs mapped to dense integer ids. Each page's outlinks are an
+    int32 array; re-scraping a page replaces its outlinks. Scores are
+    computed on a CSR snapshot built on demand and cached until the graph
+    changes. Pages may be added from several threads while others read.
+    """
+
+    def __init__(self, path: Optional[str] = None, autosave_interval: float = 60.0):
+        """
+        Args:
+            path: Optional .npz file to load from and save to
+            autosave_interval: Minimum seconds between saves in maybe_save()
+        """
+        self.path = path
+        self.autosave_interval = autosave_interval
+        self.urls: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self._out: Dict[int, array] = {}
+        self._lock = threading.Lock()
+        self._scores = None
+        # Bumped on every change, so scores computed from an older snapshot aren't cached
+        self._version = 0
+        self._dirty = False
+        self._saved_at = time.monotonic()
+        if path and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def edge_count(self) -> int:
+        with self._lock:
+            return sum(len(links) for links in self._out.values())
+
+    def _node(self, url: str) -> int:
+        node = self.ids.get(url)
+        if node is None:
+            node = len(self.urls)
+            self.ids[url] = node
+            self.urls.append(url)
+        return node
+
+    def add_page(self, url: str, links: Iterable[str], base: Optional[str] = None) -> int:
+        """
+        Record (or replace) the outlinks of a scraped page
+
+        Args:
+            url: URL of the page (after redirects)
+            links: Raw href values found on it
+            base: URL relative links resolve against, e.g. from <base href>
+                (default: url)
+
+        Returns:
+            Node id of the page
+        """
+        page = normalize_url(url, '') or url
+        base = normalize_url(base, '') or page if base else page
+        # dict keeps first-seen order, so node ids don't depend on set hashing
+        targets = dict.fromkeys(normalize_url(base, href) for href in links if href)
+        targets.pop(None, None)
+        targets.pop(page, None)
+        with self._lock:
+            source = self._node(page)
+            self._out[source] = array('i', sorted(self._node(target) for target in targets))
+            self._scores = None
+            self._version += 1
+            self._dirty = True
+        return source
+
+    def outlinks(self, url: str) -> List[str]:
+        """Resolved outlinks recorded for a page"""
+        node = self.ids.get(normalize_url(url, '') or url)
+        if node is None:
+            return []
+        with self._lock:
+            return [self.urls[target] for target in self._out.get(node, ())]
+
+    def csr(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Adjacency as (indptr, indices) arrays in CSR layout"""
+        indptr, indices, _ = self._snapshot()
+        return indptr, indices
+
+    def _snapshot(self) -> Tuple[np.ndarray, np.ndarray, int]:
+        """CSR adjacency plus the graph version it was taken at"""
+        with self._lock:
+            version = self._version
+            n = len(self.urls)
+            degrees = np.zeros(n, dtype=np.int64)
+            for source, links in self._out.items():
+                degrees[source] = len(links)
+            indptr = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(degrees, out=indptr[1:])
+            indices = np.empty(indptr[-1], dtype=np.int32)
+            for source, links in self._out.items():
+                if links:
+                    indices[indptr[source]:indptr[source + 1]] = np.frombuffer(links, dtype=np.int32)
+        return indptr, indices, version
+
+    def pagerank(self, damping: float = 0.85, tol: float = 1e-6, max_iter: int = 100) -> np.ndarray:
+        """
+        PageRank of every node, by power iteration over the edge arrays
+
+        Rank of pages without outlinks (including pages only seen as link
+        targets) is spread evenly over all nodes.
+
+        Returns:
+            float64 array indexed by node id, summing to 1. Pages added while
+            it was computed have no entry yet.
+        """
+        scores = self._scores
+        if scores is not None:
+            return scores
+        indptr, indices, version = self._snapshot()
+        n = len(indptr) - 1
+        if n == 0:
+            return np.zeros(0)
+
+        degrees = np.diff(indptr)
+        sources = np.repeat(np.arange(n), degrees)
+        dangling = degrees == 0
+        inverse_degree = np.zeros(n)
+        inverse_degree[~dangling] = 1.0 / degrees[~dangling]
+
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            spread = np.bincount(indices, weights=(rank * inverse_degree)[sources], minlength=n)
+            new_rank = damping * (spread + rank[dangling].sum() / n) + (1.0 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < tol
+            rank = new_rank
+            if converged:
+                break
+
+        with self._lock:
+            if self._version == version:
+                self._scores = rank
+        return rank
+
+    def score(self, url: str) -> float:
+        """PageRank of a URL (0.0 if it is not in the graph)"""
+        node = self.ids.get(normalize_url(url, '') or url)
+        scores = self.pagerank()
+        if node is None or node >= len(scores):
+            return 0.0
+        return float(scores[node])
+
+    def prioritize(self, items: List, key: Optional[Callable] = None) -> List:
+        """
+        Items ordered by descending PageRank; unknown URLs keep their order at the end
+
+        Args:
+            items: URLs, or other items when key is given
+            key: Function returning the URL of an item (default: the item itself)
+        """
+        scores = self.pagerank()
+        keyed = []
+        for position, item in enumerate(items):
+            url = key(item) if key else item
+            node = self.ids.get(normalize_url(url, '') or url)
+            score = scores[node] if node is not None and node < len(scores) else 0.0
+            keyed.append((-score, position))
+        return [items[position] for _, position in sorted(keyed)]
+
+    def top(self, limit: int = 20) -> List[Dict]:
+        """Highest-ranked pages as {'url', 'score', 'outlinks'} dictionaries"""
+        scores = self.pagerank()
+        if not len(scores) or limit <= 0:
+            return []
+        limit = min(limit, len(scores))
+        best = np.argpartition(-scores, limit - 1)[:limit]
+        best = best[np.argsort(-scores[best])]
+        with self._lock:
+            return [{'url': self.urls[node], 'score': float(scores[node]),
+                     'outlinks': len(self._out.get(int(node), ()))} for node in best]
+
+    def save(self, path: Optional[str] = None):
+        """Write the graph to an .npz file (atomically)"""
+        path = path or self.path
+        indptr, indices = self.csr()
+        with self._lock:
+            encoded = [url.encode('utf-8') for url in self.urls]
+            has_outlinks = np.zeros(len(self.urls), dtype=bool)
+            has_outlinks[list(self._out)] = True
+            self._dirty = False
+        # URLs are stored back to back with their end offsets, so no character
+        # inside a URL can be mistaken for a separator
+        url_offsets = np.cumsum([len(url) for url in encoded], dtype=np.int64)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, urls=np.frombuffer(b''.join(encoded), dtype=np.uint8),
+                            url_offsets=url_offsets, indptr=indptr, indices=indices, scraped=has_outlinks)
+        os.replace(tmp_path, path)
+        self._saved_at = time.monotonic()
+
+    def maybe_save(self, force: bool = False):
+        """Save to self.path if the graph changed and autosave_interval has passed (or force)"""
+        if self.path and self._dirty and (force or time.monotonic() - self._saved_at >= self.autosave_interval):
+            self.save()
+
+    def load(self, path: str):
+        """Replace the graph with one written by save()"""
+        with np.load(path) as data:
+            blob = data['urls'].tobytes()
+            ends = data['url_offsets'].tolist()
+            urls = [blob[start:end].decode('utf-8') for start, end in zip([0] + ends, ends)]
+            indptr, indices, scraped = data['indptr'], data['indices'], data['scraped']
+        with self._lock:
+            self.urls = urls
+            self.ids = {url: node for node, url in enumerate(self.urls)}
+            self._out = {int(node): array('i', indices[indptr[node]:indptr[node + 1]].tobytes())
+                         for node in np.flatnonzero(scraped)}
+            self._scores = None
+            self._version += 1
+            self._dirty = False
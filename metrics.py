@@ -0,0 +1,110 @@
+"""
+Prometheus metrics for the Flask app and DuckDuckGoScraper
+Exposes per-stage latency histograms, fetch sizes, event and error counters
+"""
+
+import time
+from typing import Dict, Optional
+
+from flask import Response, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+
+from scrape import ScraperListener
+
+REGISTRY = CollectorRegistry()
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+STAGE_SECONDS = Histogram(
+    'scraper_stage_seconds',
+    'Time spent in scraper stages (ddgs calls per search kind, page fetch, parse)',
+    ['stage', 'kind'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+FETCH_BYTES = Histogram(
+    'scraper_page_fetch_bytes',
+    'Size of fetched page bodies in bytes',
+    buckets=SIZE_BUCKETS, registry=REGISTRY
+)
+EVENTS = Counter(
+    'scraper_events_total',
+    'Scraper events such as rate limits and cache hits/misses',
+    ['event', 'kind'], registry=REGISTRY
+)
+ERRORS = Counter(
+    'scraper_errors_total',
+    'Exceptions raised inside scraper stages',
+    ['stage', 'error'], registry=REGISTRY
+)
+REQUEST_SECONDS = Histogram(
+    'api_request_seconds',
+    'End-to-end API request latency',
+    ['endpoint'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+REQUESTS = Counter(
+    'api_requests_total',
+    'API requests by endpoint and status code',
+    ['endpoint', 'status'], registry=REGISTRY
+)
+SERIALIZE_SECONDS = Histogram(
+    'api_serialization_seconds',
+    'Time spent serializing JSON responses',
+    ['endpoint'], buckets=LATENCY_BUCKETS, registry=REGISTRY
+)
+
+
+class MetricsListener(ScraperListener):
+    """Feeds scraper stage timings and events into the Prometheus metrics"""
+    
+    def stage_finished(self, name: str, duration: float, attrs: Dict, error: Optional[BaseException]):
+        STAGE_SECONDS.labels(name, attrs.get('kind', '')).observe(duration)
+        if name == 'fetch' and 'bytes' in attrs:
+            FETCH_BYTES.observe(attrs['bytes'])
+        if error is not None:
+            ERRORS.labels(name, type(error).__name__).inc()
+    
+    def event(self, name: str, attrs: Dict):
+        EVENTS.labels(name, attrs.get('kind', '')).inc()
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that records serialization time per endpoint"""
+    
+    def dumps(self, obj, **kwargs) -> str:
+        # Only time response bodies, not Flask's own session/cookie serialization
+        if not has_request_context() or request.endpoint is None:
+            return super().dumps(obj, **kwargs)
+        started = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            SERIALIZE_SECONDS.labels(request.endpoint).observe(time.perf_counter() - started)
+
+
+def init_app(app):
+    """
+    Instrument a Flask app and register the /metrics endpoint
+    
+    Args:
+        app: Flask application
+    """
+    app.json = TimedJSONProvider(app)
+    
+    @app.before_request
+    def _start_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+    
+    @app.after_request
+    def _record_request(response):
+        started = request.environ.get('metrics.started')
+        endpoint = request.endpoint or 'unknown'
+        if started is not None and endpoint != 'metrics':
+            REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - started)
+            REQUESTS.labels(endpoint, str(response.status_code)).inc()
+        return response
+    
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint"""
+        return Response(generate_latest(REGISTRY), mimetype=CONTENT_TYPE_LATEST)
@@ -2,6 +2,7 @@
 Netlify Serverless Function for DuckDuckGo Search
 """
 
+import base64
 import json
 import sys
 import os
@@ -12,19 +13,87 @@ current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
 # Import scrape module (it's in the same directory)
-from scrape import DuckDuckGoScraper
+from scrape import DuckDuckGoScraper, is_partial
+from result_cache import ResultCache
+import http_compression
+import tracing
 
 scraper = None
 
+# Deep scrape budget when the invocation context can't tell us the time left
+DEEP_SCRAPE_BUDGET = float(os.environ.get('DEEP_SCRAPE_BUDGET', 6))
+# Time kept back from the function timeout for serializing and returning the response
+DEADLINE_MARGIN = float(os.environ.get('DEEP_SCRAPE_MARGIN', 1.5))
+# Hedge fetches slower than this percentile of recent fetches (unset: off)
+HEDGE_PERCENTILE = float(os.environ['HEDGE_PERCENTILE']) if os.environ.get('HEDGE_PERCENTILE') else None
+HEDGE_BUDGET = float(os.environ.get('HEDGE_BUDGET', 0.2))
+
+# Survives between invocations while the container is warm
+result_cache = ResultCache(
+    max_entries=int(os.environ.get('RESULT_CACHE_SIZE', 128)),
+    ttl=float(os.environ.get('RESULT_CACHE_TTL', 300)),
+    spill_dir=os.environ.get('RESULT_CACHE_DIR') or None
+)
+
+# Request tracing, enabled with TRACE_EXPORT=file:/tmp/spans.jsonl or otlp:<collector URL>
+tracer = tracing.configure_from_env()
+
 def get_scraper():
     """Get or create scraper instance"""
     global scraper
     if scraper is None:
         scraper = DuckDuckGoScraper()
+        if tracer is not None:
+            scraper.add_listener(tracing.TracingListener(tracer))
     return scraper
 
 def handler(event, context):
     """Netlify function handler"""
+    request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    if tracer is None:
+        return _compress(handle_request(event, context), request_headers)
+    
+    try:
+        with tracer.span('netlify.handler', traceparent=request_headers.get('traceparent'),
+                         **{'http.method': event.get('httpMethod', '')}) as span:
+            response = handle_request(event, context)
+            span.set_attribute('http.status_code', response['statusCode'])
+            response['headers']['X-Trace-Id'] = span.trace_id
+            return _compress(response, request_headers)
+    finally:
+        # The container may be frozen as soon as we return
+        tracer.flush()
+
+def _compress(response, request_headers):
+    """Compress the response body according to Accept-Encoding (sent base64-encoded)"""
+    body, encoding = http_compression.compress(
+        response['body'].encode('utf-8'),
+        request_headers.get('accept-encoding', ''),
+        response['headers'].get('Content-Type', '')
+    )
+    response['headers']['Vary'] = 'Accept-Encoding'
+    if encoding is not None:
+        response['body'] = base64.b64encode(body).decode('ascii')
+        response['isBase64Encoded'] = True
+        response['headers']['Content-Encoding'] = encoding
+    return response
+
+def _deep_scrape_budget(context) -> float:
+    """Seconds available for deep scraping in this invocation"""
+    get_remaining = getattr(context, 'get_remaining_time_in_millis', None)
+    if get_remaining is None:
+        return DEEP_SCRAPE_BUDGET
+    return max(get_remaining() / 1000.0 - DEADLINE_MARGIN, 0.0)
+
+def _tag_span(**attributes):
+    """Add attributes to the active trace span, if tracing is enabled"""
+    span = tracing.current_span()
+    if span is not None:
+        for key, value in attributes.items():
+            span.set_attribute(key, value)
+
+def handle_request(event, context):
+    """Handle one search request"""
     # Default response headers
     headers = {
         'Access-Control-Allow-Origin': '*',
@@ -38,7 +107,7 @@ def handler(event, context):
                 'statusCode': 200,
                 'headers': {
                     'Access-Control-Allow-Origin': '*',
-                    'Access-Control-Allow-Headers': 'Content-Type',
+                    'Access-Control-Allow-Headers': 'Content-Type, Cache-Control, traceparent',
                     'Access-Control-Allow-Methods': 'POST, OPTIONS'
                 },
                 'body': json.dumps({})
@@ -62,6 +131,7 @@ def handler(event, context):
         region = body.get('region', 'us-en')
         deep_scrape = body.get('deep_scrape', False)
         max_pages = int(body.get('max_pages', 3)) if deep_scrape else 0
+        probe = bool(body.get('probe', False))
         
         if not query:
             return {
@@ -73,18 +143,49 @@ def handler(event, context):
                 'body': json.dumps({'error': 'Query is required'})
             }
         
+        # Serve repeated searches from the warm-container cache
+        request_headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+        use_cache = result_cache.max_entries > 0 and 'no-cache' not in request_headers.get('cache-control', '')
+        cache_key = ResultCache.make_key(search_type, query, region, max_results, max_pages, probe)
+        cache_headers = {
+            'X-Cache': 'BYPASS',
+            'Access-Control-Expose-Headers': 'X-Cache, Age'
+        }
+        if use_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                cached_body, age = cached
+                _tag_span(cache='hit')
+                return {
+                    'statusCode': 200,
+                    'headers': {
+                        'Access-Control-Allow-Origin': '*',
+                        'Content-Type': 'application/json',
+                        **cache_headers,
+                        'X-Cache': 'HIT',
+                        'Age': str(int(age))
+                    },
+                    'body': cached_body
+                }
+            cache_headers['X-Cache'] = 'MISS'
+            _tag_span(cache='miss')
+        
         scraper = get_scraper()
         results = []
+        partial = None
         
         try:
             if search_type == 'text':
                 results = scraper.search(query, max_results=max_results, region=region)
                 if deep_scrape and results:
-                    # Skip deep scrape on Netlify to avoid timeout
-                    # results = scraper.enhance_results_with_page_content(results, max_pages=max_pages)
-                    pass
+                    # Scrape only what fits before the function times out
+                    results = scraper.enhance_results_with_page_content(
+                        results, max_pages=max_pages, time_budget=_deep_scrape_budget(context),
+                        hedge_percentile=HEDGE_PERCENTILE, hedge_budget=HEDGE_BUDGET
+                    )
+                    partial = is_partial(results)
             elif search_type == 'images':
-                results = scraper.search_images(query, max_results=max_results)
+                results = scraper.search_images(query, max_results=max_results, probe=probe)
             elif search_type == 'news':
                 results = scraper.search_news(query, max_results=max_results, region=region)
             elif search_type == 'videos':
@@ -114,17 +215,26 @@ def handler(event, context):
                 })
             }
         
+        response_data = {
+            'success': True,
+            'results': results,
+            'count': len(results)
+        }
+        if partial is not None:
+            response_data['partial'] = partial
+        response_body = json.dumps(response_data)
+        # Empty result sets are usually rate limits or upstream errors; don't pin them
+        if use_cache and results and not partial:
+            result_cache.set(cache_key, response_body)
+        
         return {
             'statusCode': 200,
             'headers': {
                 'Access-Control-Allow-Origin': '*',
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                **cache_headers
             },
-            'body': json.dumps({
-                'success': True,
-                'results': results,
-                'count': len(results)
-            })
+            'body': response_body
         }
         
     except Exception as e:
@@ -0,0 +1,127 @@
+"""
+Response compression for the Flask app and the Netlify function
+Picks brotli, zstd or gzip from the client's Accept-Encoding and compresses
+text-like bodies above a size threshold.
+
+gzip is always available; brotli needs the 'brotli' package and zstd the
+'backports.zstd' package (built in from Python 3.14).
+"""
+
+import gzip
+from functools import lru_cache
+from typing import Callable, Dict, Optional, Tuple
+
+# Bodies smaller than this are sent as is; compressing them rarely pays off
+MIN_SIZE = 1024
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson', 'application/javascript',
+                      'application/xml', 'image/svg+xml')
+
+# Server preference when the client accepts several encodings equally
+PREFERENCE = ('br', 'zstd', 'gzip')
+
+
+@lru_cache(maxsize=None)
+def codecs() -> Dict[str, Callable[[bytes], bytes]]:
+    """Available encodings mapped to their compress functions"""
+    available = {'gzip': lambda data: gzip.compress(data, compresslevel=6)}
+    try:
+        import brotli
+        # Quality 5 is close to gzip -9 in speed and noticeably smaller
+        available['br'] = lambda data: brotli.compress(data, quality=5)
+    except ImportError:
+        pass
+    try:
+        try:
+            from compression import zstd
+        except ImportError:
+            from backports import zstd
+        available['zstd'] = lambda data: zstd.compress(data, level=3)
+    except ImportError:
+        pass
+    return available
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """
+    Choose a content encoding from an Accept-Encoding header
+
+    Returns:
+        'br', 'zstd' or 'gzip', or None if the client accepts none of the
+        available encodings
+    """
+    weights = {}
+    for item in (accept_encoding or '').split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    available = codecs()
+    best, best_q = None, 0.0
+    for encoding in PREFERENCE:
+        if encoding not in available:
+            continue
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, accept_encoding: str, content_type: str,
+             min_size: int = MIN_SIZE) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a response body if the client and content type allow it
+
+    Args:
+        body: Response body
+        accept_encoding: Request Accept-Encoding header
+        content_type: Response Content-Type
+        min_size: Smallest body that is compressed
+
+    Returns:
+        (body, encoding) - encoding is None when the body was left as is
+    """
+    if len(body) < min_size or not (content_type or '').startswith(COMPRESSIBLE_TYPES):
+        return body, None
+    encoding = negotiate(accept_encoding)
+    if encoding is None:
+        return body, None
+    return codecs()[encoding](body), encoding
+
+
+def init_app(app, min_size: int = MIN_SIZE):
+    """
+    Compress Flask responses according to Accept-Encoding
+
+    Register this before other after_request hooks that rewrite the body
+    (Flask runs after_request hooks in reverse order, so it then runs last).
+
+    Args:
+        app: Flask application
+        min_size: Smallest body that is compressed
+    """
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)):
+            return response
+        response.vary.add('Accept-Encoding')
+        body, encoding = compress(response.get_data(), request.headers.get('Accept-Encoding', ''),
+                                  response.mimetype, min_size)
+        if encoding is not None:
+            response.set_data(body)
+            response.headers['Content-Encoding'] = encoding
+        return response
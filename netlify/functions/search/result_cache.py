@@ -0,0 +1,124 @@
+"""
+Warm-container result cache for the Netlify function
+A bounded in-memory LRU with a TTL and optional spill to /tmp, both of which
+survive between invocations while the serverless container stays warm
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+
+class ResultCache:
+    """Bounded LRU cache of serialized response bodies"""
+
+    def __init__(self, max_entries: int = 128, ttl: float = 300.0, spill_dir: Optional[str] = None,
+                 max_spill_bytes: int = 50 * 1024 * 1024):
+        """
+        Args:
+            max_entries: Maximum number of bodies kept in memory
+            ttl: Seconds an entry stays fresh
+            spill_dir: Optional directory (e.g. under /tmp) that also receives
+                every entry, so entries evicted from memory can be reloaded
+            max_spill_bytes: Size limit of spill_dir; oldest files are removed first
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.spill_dir = spill_dir
+        self.max_spill_bytes = max_spill_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        """Build a cache key from request parameters"""
+        return hashlib.sha256(json.dumps(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """
+        Look up a fresh entry
+
+        Returns:
+            (body, age in seconds) or None on a miss
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, stored_at = entry
+                if now - stored_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    return body, now - stored_at
+                del self._entries[key]
+
+        body, stored_at = self._read_spill(key, now)
+        if body is None:
+            return None
+        self._remember(key, body, stored_at)
+        return body, now - stored_at
+
+    def set(self, key: str, body: str):
+        """Store a serialized response body"""
+        stored_at = time.time()
+        self._remember(key, body, stored_at)
+        self._write_spill(key, body)
+
+    def _remember(self, key: str, body: str, stored_at: float):
+        with self._lock:
+            self._entries[key] = (body, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _spill_path(self, key: str) -> str:
+        return os.path.join(self.spill_dir, f"{key}.json")
+
+    def _read_spill(self, key: str, now: float):
+        """Load an entry from the spill directory if present and fresh"""
+        if not self.spill_dir:
+            return None, None
+        path = self._spill_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if now - stored_at >= self.ttl:
+                os.remove(path)
+                return None, None
+            with open(path, 'r', encoding='utf-8') as f:
+                return f.read(), stored_at
+        except OSError:
+            return None, None
+
+    def _write_spill(self, key: str, body: str):
+        """Write an entry to the spill directory and keep it under its size limit"""
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(body)
+            os.replace(tmp_path, path)
+            self._prune_spill()
+        except OSError:
+            # /tmp full or read-only: the in-memory copy still works
+            pass
+
+    def _prune_spill(self):
+        files = []
+        total = 0
+        for entry in os.scandir(self.spill_dir):
+            if entry.name.endswith('.json'):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        for _, size, path in sorted(files):
+            if total <= self.max_spill_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -1,41 +1,1160 @@
 """
 DuckDuckGo Web Scraper
 A simple web scraper to search and extract results from DuckDuckGo
+
+Heavy dependencies (ddgs, requests, bs4, multiprocessing) are imported on
+first use rather than at module load, so importing this module stays cheap
+for serverless cold starts that never reach those code paths.
 """
 
-from ddgs import DDGS
-try:
-    from ddgs.exceptions import RatelimitException
-except ImportError:
-    # Create a simple exception class if import fails
-    class RatelimitException(Exception):
-        pass
+import contextvars
 import json
-from typing import List, Dict, Optional
-import traceback
+import logging
+import re
+import secrets
+import sys
+import threading
+import codecs
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
 import time
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urlparse
+from concurrent.futures import BrokenExecutor, Future
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+# page_content_status of results whose page could not be scraped before the deadline
+DEADLINE_EXCEEDED = 'deadline_exceeded'
+# page_content_status of results whose fetch was abandoned because a hedged sibling won
+HEDGE_ABANDONED = 'hedge_abandoned'
+
+# Browser User-Agent sent with page fetches
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Hedge delay used until enough fetches have been timed to compute a percentile
+HEDGE_DEFAULT_DELAY = 2.0
+
+# Search kinds, in the order search_all() reports them
+SEARCH_KINDS = ('text', 'news', 'videos', 'images')
+
+# Exceptions raised inside stages, collected per context while search_all() runs
+_stage_errors = contextvars.ContextVar('stage_errors', default=None)
+
+# Optional callable(fn, *args) that runs work handed to the scraper's thread
+# pools, e.g. profiling.profiled_call to profile those threads as well
+task_wrapper = contextvars.ContextVar('task_wrapper', default=None)
+
+
+@lru_cache(maxsize=None)
+def _ratelimit_exception() -> type:
+    """Return the DDGS rate-limit exception class, importing ddgs on first use"""
+    try:
+        from ddgs.exceptions import RatelimitException
+    except ImportError:
+        # Create a simple exception class if import fails
+        class RatelimitException(Exception):
+            pass
+    return RatelimitException
+
+
+def __getattr__(name: str):
+    """Resolve RatelimitException lazily for `from scrape import RatelimitException`"""
+    if name == 'RatelimitException':
+        return _ratelimit_exception()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def is_partial(results: List[Dict]) -> bool:
+    """True if a deadline-bounded deep scrape stopped before scraping every page it wanted"""
+    return any(result.get('page_content_status') == DEADLINE_EXCEEDED for result in results)
+
+# Tags that never hold article text; removed before main-content scoring
+BOILERPLATE_TAGS = {'script', 'style', 'template', 'nav', 'footer',
+                    'aside', 'noscript', 'iframe', 'svg', 'button', 'select'}
+
+# Tags that usually hold boilerplate but sometimes wrap the whole page (ASP.NET
+# WebForms and many CMS templates put everything in one <form>); removed only
+# when they hold less than this share of the page's paragraph text
+WRAPPER_TAGS = {'form', 'header'}
+WRAPPER_MAX_SHARE = 0.5
+
+# Block-level tags whose text is scored when looking for the article body
+CONTENT_TAGS = {'p', 'pre', 'blockquote', 'td'}
+
+POSITIVE_HINTS = re.compile(r'article|body|content|entry|main|post|story|text', re.I)
+NEGATIVE_HINTS = re.compile(
+    r'banner|breadcrumb|comment|consent|cookie|footer|header|menu|modal|nav|'
+    r'newsletter|popup|promo|related|share|sidebar|social|sponsor|subscribe',
+    re.I
+)
+
+
+def _class_weight(tag) -> float:
+    """Score bonus/penalty from a tag's class and id attributes"""
+    hints = ' '.join(tag.get('class', [])) + ' ' + (tag.get('id') or '')
+    weight = 0.0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    if tag.name in ('article', 'main'):
+        weight += 25
+    return weight
+
+
+def _link_density(tag, text_length: int) -> float:
+    """Fraction of a tag's text that sits inside links"""
+    if not text_length:
+        return 1.0
+    link_length = sum(len(a.get_text(strip=True)) for a in tag.find_all('a'))
+    return min(link_length / text_length, 1.0)
+
+
+def extract_main_content(soup) -> str:
+    """
+    Extract the article body from a parsed page, dropping boilerplate
+    
+    Uses readability-style scoring: every paragraph-like block adds a score
+    to its parent (and half to its grandparent) based on its text length and
+    comma count, class/id hints adjust the score, and candidates are
+    penalised by their link density. The text of the best candidate is
+    returned. Scripts, styles and other boilerplate are removed from the
+    soup in the same pass, so the caller does not need to strip them first;
+    forms and headers are removed unless most of the text is inside them.
+    
+    Args:
+        soup: Parsed BeautifulSoup document (modified in place)
+    
+    Returns:
+        Main text content, or the whole document text if nothing scores
+    """
+    from bs4 import Tag
+    
+    # One manual walk instead of several find_all() calls: boilerplate
+    # subtrees are never entered and paragraph blocks are not descended into.
+    # Every block and article remembers its innermost wrapper (index into
+    # wrappers, -1 for none); wrappers are [tag, parent wrapper, text length].
+    boilerplate, blocks, articles, wrappers = [], [], [], []
+    stack = [(soup, -1)]
+    while stack:
+        node, wrapper = stack.pop()
+        for child in node.contents:
+            if not isinstance(child, Tag):
+                continue
+            if child.name in BOILERPLATE_TAGS:
+                boilerplate.append(child)
+            elif child.name in CONTENT_TAGS:
+                blocks.append((child, wrapper))
+            elif child.name in WRAPPER_TAGS:
+                wrappers.append([child, wrapper, 0])
+                stack.append((child, len(wrappers) - 1))
+            else:
+                if child.name == 'article':
+                    articles.append((child, wrapper))
+                stack.append((child, wrapper))
+    
+    # extract() only unlinks the subtree, which is much cheaper than decompose()
+    for tag in boilerplate:
+        tag.extract()
+    
+    # Keep a wrapper only if it holds most of the paragraph text. Block texts
+    # are computed here only when needed, so the <article> fast path stays cheap.
+    texts = None
+    if wrappers:
+        texts = []
+        for block, wrapper in blocks:
+            text = block.get_text(strip=True)
+            texts.append(text)
+            while wrapper >= 0:
+                wrappers[wrapper][2] += len(text)
+                wrapper = wrappers[wrapper][1]
+        total = sum(map(len, texts))
+        dropped = set()
+        # Parents come before their nested wrappers, so dropping propagates down
+        for index, (tag, parent, length) in enumerate(wrappers):
+            if parent in dropped:
+                dropped.add(index)
+            elif length < WRAPPER_MAX_SHARE * total:
+                dropped.add(index)
+                tag.extract()
+        if dropped:
+            kept = [i for i, (_, wrapper) in enumerate(blocks) if wrapper not in dropped]
+            blocks = [blocks[i] for i in kept]
+            texts = [texts[i] for i in kept]
+            articles = [article for article in articles if article[1] not in dropped]
+    
+    # Fast path: a single <article> element is almost always the body
+    if len(articles) == 1:
+        text = articles[0][0].get_text(separator=' ', strip=True)
+        if len(text) >= 250:
+            return text
+    
+    if texts is None:
+        texts = [block.get_text(strip=True) for block, _ in blocks]
+    candidates = {}
+    for (block, _), text in zip(blocks, texts):
+        if len(text) < 25:
+            continue
+        
+        score = 1 + text.count(',') + min(len(text) // 100, 3)
+        parent = block.parent
+        grandparent = parent.parent if parent is not None else None
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None or ancestor.name == '[document]':
+                continue
+            entry = candidates.get(id(ancestor))
+            if entry is None:
+                entry = candidates[id(ancestor)] = [ancestor, _class_weight(ancestor)]
+            entry[1] += score * share
+    
+    if not candidates:
+        return soup.get_text(separator=' ', strip=True)
+    
+    # Link density is comparatively expensive, so only check the front-runners
+    best_text, best_score = '', float('-inf')
+    for tag, score in sorted(candidates.values(), key=lambda c: c[1], reverse=True)[:5]:
+        text = tag.get_text(separator=' ', strip=True)
+        score *= 1 - _link_density(tag, len(text))
+        if score > best_score:
+            best_text, best_score = text, score
+    
+    return best_text
+
+
+def _apply_meta(page_data: Dict, name: str, property_attr: str, content: str):
+    """Record one <meta> tag (lower-cased name/property) in page_data"""
+    if name == 'description' or property_attr == 'og:description':
+        page_data['description'] = content
+    elif name == 'keywords':
+        page_data['keywords'] = [k.strip() for k in content.split(',')]
+    elif name == 'author':
+        page_data['author'] = content
+    elif property_attr == 'og:title':
+        page_data['title'] = content if not page_data['title'] else page_data['title']
+    elif property_attr == 'og:url':
+        page_data['canonical_url'] = content
+    
+    # Store all meta tags
+    if name:
+        page_data['meta_tags'][name] = content
+    if property_attr:
+        page_data['meta_tags'][property_attr] = content
+
+
+def _resolve_canonical(page_data: Dict, link_canonical: str):
+    """
+    Set canonical_url: <link rel=canonical> wins over og:url, and either is
+    resolved against the document's base URL (final URL and <base href>)
+    """
+    canonical = (link_canonical or page_data['canonical_url']).strip()
+    page_data['canonical_url'] = urljoin(page_data['base_url'], canonical) if canonical else ''
+
+
+def _extract_meta(soup, page_data: Dict):
+    """Fill title, meta tags, language and charset into page_data"""
+    # Extract title
+    if soup.title:
+        page_data['title'] = soup.title.string.strip() if soup.title.string else ''
+    
+    # Extract meta tags
+    for meta in soup.find_all('meta'):
+        _apply_meta(page_data, meta.get('name', '').lower(), meta.get('property', '').lower(),
+                    meta.get('content', ''))
+    
+    # Extract language and charset
+    html_tag = soup.find('html')
+    if html_tag:
+        page_data['language'] = html_tag.get('lang', '')
+    
+    meta_charset = soup.find('meta', charset=True)
+    if meta_charset:
+        page_data['charset'] = meta_charset.get('charset', '')
+    
+    canonical = soup.find('link', rel='canonical', href=True)
+    _resolve_canonical(page_data, canonical['href'] if canonical is not None else '')
+
+
+def _extract_headings(soup, page_data: Dict):
+    """Fill h1-h6 heading texts into page_data"""
+    for level in range(1, 7):
+        headings = soup.find_all(f'h{level}')
+        page_data['headings'][f'h{level}'] = [h.get_text().strip() for h in headings]
+
+
+def _extract_images(soup, page_data: Dict):
+    """Fill image src/alt/title entries into page_data"""
+    for img in soup.find_all('img'):
+        img_info = {
+            'src': img.get('src', ''),
+            'alt': img.get('alt', ''),
+            'title': img.get('title', '')
+        }
+        if img_info['src']:
+            page_data['images'].append(img_info)
+
+
+def _extract_links(soup, page_data: Dict):
+    """Fill link href/text entries into page_data"""
+    for link in soup.find_all('a', href=True):
+        page_data['links'].append({
+            'url': link.get('href', ''),
+            'text': link.get_text().strip()[:100]
+        })
+
+
+def _extract_text(soup, page_data: Dict, extract: str = 'full'):
+    """Fill text_content and the truncated content field into page_data"""
+    # Extract main text content (remove scripts and styles)
+    if extract == 'main':
+        page_data['text_content'] = extract_main_content(soup)
+    else:
+        for script in soup(["script", "style", "meta", "link"]):
+            script.decompose()
+        page_data['text_content'] = soup.get_text(separator=' ', strip=True)
+    page_data['content'] = page_data['text_content'][:5000]  # Limit content size
+    page_data['extract'] = extract
+
+
+def parse_page_content(url: str, html, extract: str = 'full',
+                       timings: Optional[Dict] = None, final_url: Optional[str] = None) -> Dict:
+    """
+    Extract structured page data from a downloaded HTML document
+    
+    Args:
+        url: URL the document was requested from
+        html: Raw document body (bytes or str)
+        extract: 'full' for all document text, or 'main' for the article body
+        timings: Optional dict that receives seconds spent per stage
+            (parse, meta, headings, images, links, text)
+        final_url: URL the document was served from after redirects
+            (default: url)
+    
+    Returns:
+        Dictionary with extracted page data; 'final_url' and 'base_url' (the
+        URL relative links resolve against, honoring <base href>) included
+    """
+    from bs4 import BeautifulSoup
+    
+    clock = time.perf_counter
+    started = clock()
+    soup = BeautifulSoup(html, 'html.parser')
+    marks = [('parse', clock())]
+    
+    # Extract comprehensive page data
+    page_data = {
+        'url': url,
+        'title': '',
+        'description': '',
+        'keywords': [],
+        'author': '',
+        'content': '',
+        'images': [],
+        'links': [],
+        'meta_tags': {},
+        'headings': {},
+        'text_content': '',
+        'language': '',
+        'charset': '',
+        'canonical_url': '',
+        'final_url': final_url or url,
+        'base_url': final_url or url
+    }
+    
+    base = soup.find('base', href=True)
+    if base is not None and base['href'].strip():
+        page_data['base_url'] = urljoin(page_data['final_url'], base['href'].strip())
+    
+    _extract_meta(soup, page_data)
+    marks.append(('meta', clock()))
+    _extract_headings(soup, page_data)
+    marks.append(('headings', clock()))
+    _extract_images(soup, page_data)
+    marks.append(('images', clock()))
+    _extract_links(soup, page_data)
+    marks.append(('links', clock()))
+    _extract_text(soup, page_data, extract)
+    marks.append(('text', clock()))
+    
+    if timings is not None:
+        previous = started
+        for stage, mark in marks:
+            timings[stage] = timings.get(stage, 0.0) + mark - previous
+            previous = mark
+    
+    return page_data
+
+
+# Most bytes read in head-only mode when a page never closes its <head>
+HEAD_MAX_BYTES = 256 * 1024
+# Bytes buffered in head-only mode before picking a decoder, as in the HTML
+# spec's encoding prescan
+CHARSET_SNIFF_BYTES = 1024
+
+
+def _charset_from_content_type(content_type: str) -> Optional[str]:
+    """Charset parameter of a Content-Type header, if it names a known codec"""
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.strip().partition('=')
+        if key.lower() == 'charset':
+            charset = value.strip('"\' ')
+            try:
+                codecs.lookup(charset)
+                return charset
+            except LookupError:
+                return None
+    return None
+
+
+def _sniff_charset(data: bytes, header_charset: Optional[str]) -> str:
+    """
+    Encoding to decode a streamed document with
+    
+    A byte order mark wins, then the HTTP charset, then a <meta charset> or
+    http-equiv declaration in data (found the same way BeautifulSoup does for
+    full parses), then utf-8.
+    """
+    if data.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    if header_charset:
+        return header_charset
+    from bs4.dammit import EncodingDetector
+    
+    declared = EncodingDetector.find_declared_encoding(data, is_html=True)
+    if declared:
+        try:
+            # A document readable as ASCII can't really be UTF-16
+            if not codecs.lookup(declared).name.startswith('utf-16'):
+                return declared
+        except LookupError:
+            pass
+    return 'utf-8'
+
+
+class HeadParser(HTMLParser):
+    """
+    Incremental parser for the metadata in a document's <head>
+    
+    Feed it chunks as they arrive and stop once done is set (at </head> or
+    the first <body> tag); no document tree is built.
+    """
+    
+    def __init__(self, url: str, final_url: Optional[str] = None):
+        """
+        Args:
+            url: URL the document was requested from
+            final_url: URL it was served from after redirects (default: url)
+        """
+        super().__init__(convert_charrefs=True)
+        self.page_data = {
+            'url': url,
+            'title': '',
+            'description': '',
+            'keywords': [],
+            'author': '',
+            'meta_tags': {},
+            'language': '',
+            'charset': '',
+            'canonical_url': '',
+            'final_url': final_url or url,
+            'base_url': final_url or url
+        }
+        self.done = False
+        self._base_seen = False
+        self._title = None
+        self._in_title = False
+        self._canonical = ''
+    
+    def handle_starttag(self, tag: str, attrs):
+        attrs = {key: value or '' for key, value in attrs}
+        if tag == 'html':
+            self.page_data['language'] = attrs.get('lang', '')
+        elif tag == 'title' and self._title is None:
+            self._title = []
+            self._in_title = True
+        elif tag == 'meta':
+            if 'charset' in attrs:
+                self.page_data['charset'] = attrs['charset']
+            elif attrs.get('http-equiv', '').lower() == 'content-type':
+                self.page_data['charset'] = _charset_from_content_type(attrs.get('content', '')) or ''
+            _apply_meta(self.page_data, attrs.get('name', '').lower(), attrs.get('property', '').lower(),
+                        attrs.get('content', ''))
+        elif tag == 'link' and 'canonical' in attrs.get('rel', '').lower().split():
+            if not self._canonical:
+                self._canonical = attrs.get('href', '')
+        elif tag == 'base' and 'href' in attrs and not self._base_seen:
+            # Only the first <base href> counts, as in parse_page_content
+            self._base_seen = True
+            if attrs['href'].strip():
+                self.page_data['base_url'] = urljoin(self.page_data['final_url'], attrs['href'].strip())
+        elif tag == 'body':
+            self.done = True
+    
+    def handle_endtag(self, tag: str):
+        if tag == 'title':
+            self._in_title = False
+        elif tag == 'head':
+            self.done = True
+    
+    def handle_data(self, data: str):
+        if self._in_title:
+            self._title.append(data)
+    
+    def result(self) -> Dict:
+        """Collected metadata; <title> wins over og:title and rel=canonical over og:url"""
+        title = ''.join(self._title or []).strip()
+        if title:
+            self.page_data['title'] = title
+        _resolve_canonical(self.page_data, self._canonical)
+        return self.page_data
+
+
+def _parse_task(url: str, content: bytes, extract: str, truncated: bool,
+                final_url: Optional[str] = None) -> Dict:
+    """Process-pool entry point: parse one body and flag it if it was cut short"""
+    page_data = parse_page_content(url, content, extract=extract, final_url=final_url)
+    if truncated:
+        page_data['truncated'] = True
+    return page_data
+
+
+# Bytes requested when probing an image; enough for PNG/GIF/WebP and nearly all JPEG headers
+IMAGE_PROBE_BYTES = 16 * 1024
+# Probe results remembered per scraper (least recently used are dropped)
+IMAGE_PROBE_CACHE_SIZE = 4096
+
+# JPEG start-of-frame markers (SOF0-SOF15 except DHT, JPG and DAC)
+_JPEG_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def _jpeg_size(data: bytes):
+    """(width, height) from the first SOF segment of a JPEG, or None if not in data"""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        length = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        if marker in _JPEG_SOF_MARKERS:
+            if offset + 9 > len(data):
+                return None
+            height = int.from_bytes(data[offset + 5:offset + 7], 'big')
+            width = int.from_bytes(data[offset + 7:offset + 9], 'big')
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def parse_image_header(data: bytes) -> Optional[Dict]:
+    """
+    Read the format and dimensions from the first bytes of an image
+    
+    Args:
+        data: Leading bytes of the file (see IMAGE_PROBE_BYTES)
+    
+    Returns:
+        Dictionary with 'format' and, when found, 'width' and 'height';
+        None if the format is not PNG, GIF, JPEG or WebP
+    """
+    size = None
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        image_format = 'png'
+        if len(data) >= 24 and data[12:16] == b'IHDR':
+            size = int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+    elif data[:6] in (b'GIF87a', b'GIF89a'):
+        image_format = 'gif'
+        if len(data) >= 10:
+            size = int.from_bytes(data[6:8], 'little'), int.from_bytes(data[8:10], 'little')
+    elif data.startswith(b'\xff\xd8'):
+        image_format = 'jpeg'
+        size = _jpeg_size(data)
+    elif data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        image_format = 'webp'
+        chunk = data[12:16]
+        if chunk == b'VP8 ' and len(data) >= 30:
+            size = (int.from_bytes(data[26:28], 'little') & 0x3FFF,
+                    int.from_bytes(data[28:30], 'little') & 0x3FFF)
+        elif chunk == b'VP8L' and len(data) >= 25:
+            bits = int.from_bytes(data[21:25], 'little')
+            size = (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        elif chunk == b'VP8X' and len(data) >= 30:
+            size = int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+    else:
+        return None
+    
+    info = {'format': image_format}
+    if size:
+        info['width'], info['height'] = size
+    return info
+
+
+class ScraperListener:
+    """
+    Observer for DuckDuckGoScraper instrumentation hooks
+    
+    Subclass and override the methods you need, then register the instance
+    with DuckDuckGoScraper.add_listener(). Stages are timed sections such as
+    'ddgs' (one search call, with a 'kind' attribute), 'fetch', 'parse' and
+    'probe' (an image header read);
+    events are point-in-time occurrences such as 'rate_limit' or 'cache_hit'.
+    """
+    
+    def stage_started(self, name: str, attrs: Dict):
+        """Called when a stage begins"""
+    
+    def stage_finished(self, name: str, duration: float, attrs: Dict, error: Optional[BaseException]):
+        """Called when a stage ends, with its duration in seconds and any exception raised"""
+    
+    def event(self, name: str, attrs: Dict):
+        """Called for point-in-time events"""
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket shared by every DDGS call of a scraper
+    
+    Callers reserve a token and sleep until it is due, so concurrent
+    searches are spaced out instead of all hitting DuckDuckGo at once.
+    """
+    
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Sustained calls per second
+            burst: Calls allowed back to back after an idle period
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until it is available
+        
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of fetching from a host whose circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breakers for page fetches
+    
+    After failure_threshold consecutive failures (connection errors, timeouts
+    or 5xx responses) a host's circuit opens and fetches to it fail
+    immediately with CircuitOpenError. After reset_timeout seconds the
+    circuit is half-open: a limited number of trial requests go through, and
+    the first result closes the circuit again or re-opens it. State is
+    shared by every request that uses the same scraper.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_requests: int = 1, max_hosts: int = 10000):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open a host's circuit
+            reset_timeout: Seconds an open circuit waits before allowing a trial request
+            half_open_requests: Trial requests allowed at once while half-open
+            max_hosts: Hosts tracked; the least recently seen are forgotten
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_requests = half_open_requests
+        self.max_hosts = max_hosts
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _host(self, host: str) -> Dict:
+        state = self._hosts.get(host)
+        if state is None:
+            state = {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0, 'trials': 0}
+            self._hosts[host] = state
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        return state
+    
+    def before_request(self, host: str):
+        """
+        Reserve a request to host
+        
+        Raises:
+            CircuitOpenError if the host's circuit is open (or half-open with
+            its trial requests already in flight)
+        """
+        with self._lock:
+            state = self._host(host)
+            if state['state'] == self.OPEN:
+                if time.monotonic() - state['opened_at'] < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit open for {host}")
+                state['state'] = self.HALF_OPEN
+                state['trials'] = 0
+            if state['state'] == self.HALF_OPEN:
+                if state['trials'] >= self.half_open_requests:
+                    raise CircuitOpenError(f"Circuit half-open for {host}; trial request in flight")
+                state['trials'] += 1
+    
+    def record_success(self, host: str):
+        with self._lock:
+            state = self._host(host)
+            state['state'] = self.CLOSED
+            state['failures'] = 0
+    
+    def record_failure(self, host: str) -> bool:
+        """
+        Count a failed request
+        
+        Returns:
+            True if this failure opened the circuit
+        """
+        with self._lock:
+            state = self._host(host)
+            state['failures'] += 1
+            if state['state'] == self.HALF_OPEN or (state['state'] == self.CLOSED
+                                                    and state['failures'] >= self.failure_threshold):
+                state['state'] = self.OPEN
+                state['opened_at'] = time.monotonic()
+                return True
+            return False
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """State and failure count of every host that is not closed"""
+        with self._lock:
+            return {host: {'state': state['state'], 'failures': state['failures']}
+                    for host, state in self._hosts.items() if state['state'] != self.CLOSED}
+
+
+class HostTimeouts:
+    """
+    Per-host connect and read timeouts learned from observed latency
+    
+    Both follow a smoothed estimate plus four times its mean deviation (the
+    same rule TCP uses for its retransmission timer), so fast hosts that
+    hang are cut off early while slow but steady hosts keep the time they
+    usually need. Read timeouts track time to first byte; connect timeouts
+    track the TCP + TLS setup time of new connections, measured on its own
+    so a slow handshake in front of a fast server (or the reverse) doesn't
+    skew the other. Until a host has connect samples (reused keep-alive
+    connections produce none), three times its fastest response bounds the
+    connect timeout. Hosts without enough samples get the caller's timeout.
+    """
+    
+    def __init__(self, alpha: float = 0.125, read_floor: float = 2.0, connect_floor: float = 1.0,
+                 connect_ceiling: float = 5.0, min_samples: int = 3, max_hosts: int = 10000):
+        """
+        Args:
+            alpha: EWMA weight of each new sample
+            read_floor: Smallest read timeout handed out, in seconds
+            connect_floor: Smallest connect timeout (one SYN retransmit is 1s)
+            connect_ceiling: Largest connect timeout
+            min_samples: Samples needed before a host's estimate is used
+            max_hosts: Hosts tracked; the least recently seen are forgotten
+        """
+        self.alpha = alpha
+        self.read_floor = read_floor
+        self.connect_floor = connect_floor
+        self.connect_ceiling = connect_ceiling
+        self.min_samples = min_samples
+        self.max_hosts = max_hosts
+        self._hosts = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def timeout(self, host: str, ceiling: float):
+        """
+        (connect, read) timeouts for a request to host
+        
+        Args:
+            host: Host (netloc) being fetched
+            ceiling: Upper bound for both timeouts, e.g. the caller's timeout
+        """
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                return min(self.connect_ceiling, ceiling), ceiling
+            self._hosts.move_to_end(host)
+            read = connect = None
+            if stats['samples'] >= self.min_samples:
+                read = stats['ewma'] + 4 * stats['deviation']
+                connect = 3 * stats['fastest']
+            if stats['connect_samples'] >= self.min_samples:
+                connect = stats['connect_ewma'] + 4 * stats['connect_deviation']
+        read = ceiling if read is None else min(max(read, self.read_floor), ceiling)
+        connect = self.connect_ceiling if connect is None else max(connect, self.connect_floor)
+        return min(connect, self.connect_ceiling, ceiling), read
+    
+    def record(self, host: str, seconds: float):
+        """Add a time-to-first-byte sample (or the timeout that expired) for host"""
+        with self._lock:
+            stats = self._update(host, '', seconds)
+            stats['fastest'] = min(stats['fastest'], seconds)
+    
+    def record_connect(self, host: str, seconds: float):
+        """Add a connection setup (TCP + TLS) sample, or the connect timeout that expired, for host"""
+        with self._lock:
+            self._update(host, 'connect_', seconds)
+    
+    def _update(self, host: str, prefix: str, seconds: float) -> Dict:
+        stats = self._hosts.get(host)
+        if stats is None:
+            stats = self._hosts[host] = {'ewma': 0.0, 'deviation': 0.0, 'fastest': float('inf'), 'samples': 0,
+                                         'connect_ewma': 0.0, 'connect_deviation': 0.0, 'connect_samples': 0}
+            while len(self._hosts) > self.max_hosts:
+                self._hosts.popitem(last=False)
+        else:
+            self._hosts.move_to_end(host)
+        if stats[prefix + 'samples'] == 0:
+            stats[prefix + 'ewma'] = seconds
+            stats[prefix + 'deviation'] = seconds / 2
+        else:
+            stats[prefix + 'deviation'] += self.alpha * (abs(seconds - stats[prefix + 'ewma'])
+                                                         - stats[prefix + 'deviation'])
+            stats[prefix + 'ewma'] += self.alpha * (seconds - stats[prefix + 'ewma'])
+        stats[prefix + 'samples'] += 1
+        return stats
+
+
+def _timed_connection_class(base, on_connect):
+    """Subclass of a urllib3 connection class that reports how long connect() took"""
+    from urllib3.exceptions import ConnectTimeoutError
+    
+    class TimedConnection(base):
+        def connect(self):
+            started = time.perf_counter()
+            try:
+                super().connect()
+            except ConnectTimeoutError:
+                on_connect(self._netloc(), time.perf_counter() - started)
+                raise
+            on_connect(self._netloc(), time.perf_counter() - started)
+        
+        def _netloc(self):
+            # Same form as urlparse(url).netloc, which keys HostTimeouts
+            return self.host if self.port in (None, self.default_port) else f"{self.host}:{self.port}"
+    
+    return TimedConnection
+
+
+def _timed_adapter(on_connect):
+    """requests adapter whose new connections report their setup time to on_connect(host, seconds)"""
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    
+    pool_classes = {
+        'http': type('TimedHTTPConnectionPool', (HTTPConnectionPool,),
+                     {'ConnectionCls': _timed_connection_class(HTTPConnection, on_connect)}),
+        'https': type('TimedHTTPSConnectionPool', (HTTPSConnectionPool,),
+                      {'ConnectionCls': _timed_connection_class(HTTPSConnection, on_connect)}),
+    }
+    
+    class TimedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = pool_classes
+    
+    return TimedAdapter()
+
+
+def _connect_trace(on_connect):
+    """httpcore 'trace' extension that reports TCP + TLS setup time of new connections to on_connect(host, seconds)"""
+    started = None
+    host = None
+    
+    def trace(event: str, info: Dict):
+        nonlocal started, host
+        if event == 'connection.connect_tcp.started':
+            started = time.perf_counter()
+            port = info.get('port')
+            host = info.get('host')
+            host = host.decode('ascii') if isinstance(host, bytes) else host
+            # Same form as urlparse(url).netloc, which keys HostTimeouts
+            host = host if port in (None, 80, 443) else f"{host}:{port}"
+        elif started is None:
+            return
+        elif event.endswith('.failed'):
+            # Only timeouts say something about latency; refused or reset connections fail fast
+            if 'Timeout' in type(info.get('exception')).__name__:
+                on_connect(host, time.perf_counter() - started)
+            started = None
+        elif not event.startswith('connection.'):
+            # The connection (and TLS, for https) is set up once the request starts going out
+            on_connect(host, time.perf_counter() - started)
+            started = None
+    
+    return trace
+
+
+class LatencyTracker:
+    """Rolling window of recent latencies, used to pick the hedging threshold"""
+    
+    def __init__(self, window: int = 256):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, p: float, min_samples: int = 20) -> Optional[float]:
+        """
+        The p-th percentile (0-100) of the window, or None with fewer than min_samples
+        """
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100.0))]
+
+
+class CursorStore:
+    """
+    Server-side state behind opaque pagination cursors
+    
+    Each search session keeps the results fetched so far; a cursor encodes
+    the session id and an offset into them. Sessions expire after ttl
+    seconds without use, and the oldest are dropped beyond max_sessions.
+    """
+    
+    def __init__(self, ttl: float = 600.0, max_sessions: int = 1000):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def create(self, kind: str, query: str, region: str) -> Dict:
+        """Start a new search session"""
+        session = {
+            'id': secrets.token_urlsafe(12),
+            'kind': kind,
+            'query': query,
+            'region': region,
+            'results': [],
+            'requested': 0,
+            'exhausted': False,
+            'lock': threading.Lock(),
+            'expires': time.monotonic() + self.ttl,
+        }
+        with self._lock:
+            self._sessions[session['id']] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+    
+    def resolve(self, cursor: str):
+        """
+        Look up the session and offset a cursor points at
+        
+        Raises:
+            KeyError if the cursor is malformed, unknown or expired
+        """
+        try:
+            session_id, offset = urlsafe_b64decode(cursor.encode('ascii')).decode('ascii').rsplit('.', 1)
+            offset = int(offset)
+        except (ValueError, UnicodeError):
+            raise KeyError(cursor)
+        
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None or session['expires'] < now:
+                self._sessions.pop(session_id, None)
+                raise KeyError(cursor)
+            session['expires'] = now + self.ttl
+            self._sessions.move_to_end(session_id)
+        return session, offset
+    
+    @staticmethod
+    def encode(session: Dict, offset: int) -> str:
+        """Build the opaque cursor for a session offset"""
+        return urlsafe_b64encode(f"{session['id']}.{offset}".encode('ascii')).decode('ascii')
 
 
 class DuckDuckGoScraper:
     """A scraper for DuckDuckGo search results"""
     
-    def __init__(self):
-        """Initialize the scraper"""
+    def __init__(self, ddgs=None, parse_workers: int = 0, max_parse_bytes: int = 5 * 1024 * 1024,
+                 cursor_ttl: float = 600.0, rate_limiter: Optional[RateLimiter] = None,
+                 circuit_breaker: Optional[CircuitBreaker] = None,
+                 host_timeouts: Optional[HostTimeouts] = None, http2: bool = False,
+                 link_graph=None):
+        """
+        Initialize the scraper
+        
+        Args:
+            ddgs: Optional search backend exposing text/images/news/videos
+                like DDGS (e.g. a stub for offline load tests); a real DDGS
+                client is created when omitted
+            parse_workers: Size of the process pool used for HTML parsing;
+                0 (default) parses in the calling thread
+            max_parse_bytes: Largest body handed to a parse worker; longer
+                bodies are truncated and the page is marked 'truncated'
+            cursor_ttl: Seconds a pagination cursor stays valid after last use
+            rate_limiter: Optional RateLimiter applied to every DDGS call
+                (may be shared between scrapers)
+            circuit_breaker: Per-host CircuitBreaker for page fetches; a
+                default one is created when omitted
+            host_timeouts: Per-host HostTimeouts for page fetches; a default
+                one is created when omitted
+            http2: Fetch pages with httpx over HTTP/2 (pip install
+                'httpx[http2]'), so concurrent fetches from one host share a
+                single multiplexed connection; servers without HTTP/2 fall
+                back to HTTP/1.1
+            link_graph: Optional linkgraph.LinkGraph that receives the
+                outlinks of every page scraped with extract 'full' or 'main'
+        """
         try:
-            self.ddgs = DDGS()
-            self.session = requests.Session()
-            self.session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            })
+            if ddgs is None:
+                from ddgs import DDGS
+                ddgs = DDGS()
+            self.ddgs = ddgs
+            self.listeners = []
+            self.parse_workers = parse_workers
+            self.max_parse_bytes = max_parse_bytes
+            self._parse_pool = None
+            self.cursors = CursorStore(ttl=cursor_ttl)
+            self.rate_limiter = rate_limiter
+            self.fetch_latency = LatencyTracker()
+            self.circuit_breaker = circuit_breaker or CircuitBreaker()
+            self.host_timeouts = host_timeouts or HostTimeouts()
+            self.http2 = http2
+            self._http_client = None
+            self.link_graph = link_graph
+            self._probe_cache = OrderedDict()
+            self._session = None
+            self._lock = threading.Lock()
         except Exception as e:
-            print(f"Error initializing DDGS: {e}")
-            traceback.print_exc()
+            logger.exception("Error initializing DDGS: %s", e)
             raise
     
-    def search(self, query: str, max_results: int = 10, region: str = 'us-en') -> List[Dict]:
+    @property
+    def session(self):
+        """HTTP session used for page fetches (requests is imported on first use)"""
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    import requests
+                    from urllib3.util.request import ACCEPT_ENCODING
+                    session = requests.Session()
+                    session.headers.update({
+                        'User-Agent': USER_AGENT,
+                        # Every encoding urllib3 can decode here (br/zstd when their packages are installed)
+                        'Accept-Encoding': ACCEPT_ENCODING
+                    })
+                    # New connections report their setup time, which sets per-host connect timeouts
+                    adapter = _timed_adapter(self.host_timeouts.record_connect)
+                    session.mount('http://', adapter)
+                    session.mount('https://', adapter)
+                    self._session = session
+        return self._session
+    
+    @property
+    def http_client(self):
+        """httpx client used for page fetches when http2 is enabled"""
+        if self._http_client is None:
+            with self._lock:
+                if self._http_client is None:
+                    import httpx
+                    
+                    def trace_connect(request):
+                        # New connections report their setup time, which sets per-host connect timeouts
+                        request.extensions['trace'] = _connect_trace(self.host_timeouts.record_connect)
+                    
+                    self._http_client = httpx.Client(
+                        http2=True,
+                        follow_redirects=True,
+                        headers={'User-Agent': USER_AGENT},
+                        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+                        event_hooks={'request': [trace_connect]}
+                    )
+        return self._http_client
+    
+    def add_listener(self, listener: ScraperListener):
+        """
+        Register an observer for stage timings and events
+        
+        Args:
+            listener: ScraperListener instance
+        """
+        self.listeners.append(listener)
+    
+    @contextmanager
+    def _stage(self, name: str, **attrs):
+        """Time a block of work and report it to the registered listeners"""
+        if not self.listeners:
+            try:
+                yield attrs
+            except BaseException as e:
+                errors = _stage_errors.get()
+                if errors is not None:
+                    errors.append((name, e))
+                raise
+            return
+        
+        for listener in self.listeners:
+            listener.stage_started(name, attrs)
+        started = time.perf_counter()
+        error = None
+        try:
+            yield attrs
+        except BaseException as e:
+            error = e
+            errors = _stage_errors.get()
+            if errors is not None:
+                errors.append((name, e))
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            for listener in self.listeners:
+                listener.stage_finished(name, duration, attrs, error)
+    
+    def _event(self, name: str, **attrs):
+        """Report a point-in-time event to the registered listeners"""
+        for listener in self.listeners:
+            listener.event(name, attrs)
+    
+    def _throttle(self, kind: str):
+        """Wait for the rate limiter (if any) before a DDGS call"""
+        if self.rate_limiter is not None:
+            waited = self.rate_limiter.acquire()
+            if waited > 0:
+                self._event('throttled', kind=kind, seconds=waited)
+    
+    def search(self, query: str, max_results: int = 10, region: str = 'us-en',
+               rerank: bool = False) -> List[Dict]:
         """
         Search DuckDuckGo and return results
         
@@ -43,6 +1162,8 @@ class DuckDuckGoScraper:
             query: Search query string
             max_results: Maximum number of results to return (default: 10)
             region: Region/language code (default: 'us-en')
+            rerank: Re-order results by BM25 relevance of title and snippet
+                to the query (needs numpy and scipy)
         
         Returns:
             List of dictionaries containing title, url, and snippet for each result
@@ -50,11 +1171,13 @@ class DuckDuckGoScraper:
         results = []
         try:
             # Perform the search - DDGS.text() returns a generator
-            search_results = self.ddgs.text(
-                query,
-                max_results=max_results,
-                region=region
-            )
+            self._throttle('text')
+            with self._stage('ddgs', kind='text'):
+                search_results = list(self.ddgs.text(
+                    query,
+                    max_results=max_results,
+                    region=region
+                ))
             
             # Extract ALL available fields from results
             count = 0
@@ -88,14 +1211,18 @@ class DuckDuckGoScraper:
                 results.append(result_data)
                 count += 1
             
+            if rerank:
+                results = self.rerank_results(results, query)
             return results
             
         except Exception as e:
-            print(f"Error during search: {e}")
-            traceback.print_exc()
+            if isinstance(e, _ratelimit_exception()):
+                self._event('rate_limit', kind='text')
+            logger.exception("Error during search: %s", e)
             return []
     
-    def search_images(self, query: str, max_results: int = 10, retry_delay: float = 2.0) -> List[Dict]:
+    def search_images(self, query: str, max_results: int = 10, retry_delay: float = 2.0,
+                      probe: bool = False) -> List[Dict]:
         """
         Search for images on DuckDuckGo
         
@@ -103,6 +1230,8 @@ class DuckDuckGoScraper:
             query: Search query string
             max_results: Maximum number of results to return
             retry_delay: Delay in seconds before retrying after rate limit (default: 2.0)
+            probe: Fill in missing width/height/format/size by reading the
+                first bytes of each image (see probe_images)
         
         Returns:
             List of dictionaries containing image information
@@ -114,10 +1243,12 @@ class DuckDuckGoScraper:
         while retry_count < max_retries:
             try:
                 # DDGS.images() returns a generator
-                image_results = self.ddgs.images(
-                    query,
-                    max_results=max_results
-                )
+                self._throttle('images')
+                with self._stage('ddgs', kind='images'):
+                    image_results = list(self.ddgs.images(
+                        query,
+                        max_results=max_results
+                    ))
                 
                 count = 0
                 for result in image_results:
@@ -145,126 +1276,145 @@ class DuckDuckGoScraper:
                     results.append(img_data)
                     count += 1
                 
+                if probe and results:
+                    self.probe_images(results)
                 return results
                 
-            except RatelimitException as e:
+            # The except expression is only evaluated once an exception is raised
+            except _ratelimit_exception() as e:
+                self._event('rate_limit', kind='images')
                 retry_count += 1
                 if retry_count < max_retries:
-                    print(f"Rate limit hit. Waiting {retry_delay} seconds before retry {retry_count}/{max_retries-1}...")
+                    logger.warning("Rate limit hit. Waiting %s seconds before retry %d/%d...",
+                                   retry_delay, retry_count, max_retries - 1)
                     time.sleep(retry_delay)
                     retry_delay *= 2  # Exponential backoff
                 else:
-                    print(f"Error: Rate limit exceeded after {max_retries} attempts. Please try again later.")
+                    logger.error("Rate limit exceeded after %d attempts. Please try again later.", max_retries)
                     return []
             except Exception as e:
-                print(f"Error during image search: {e}")
-                traceback.print_exc()
+                logger.exception("Error during image search: %s", e)
                 return []
         
         return []
     
-    def scrape_page_content(self, url: str, timeout: int = 10) -> Optional[Dict]:
+    def probe_images(self, results: List[Dict], max_workers: int = 8, timeout: float = 5) -> List[Dict]:
+        """
+        Add width, height, format and size to image results that lack them
+        
+        Only the first IMAGE_PROBE_BYTES of each image are requested (HTTP
+        Range), concurrently. Probes are cached by URL, including failures.
+        
+        Args:
+            results: Image result dictionaries from search_images (updated in place)
+            max_workers: Number of concurrent probes
+            timeout: Per-request timeout in seconds
+        
+        Returns:
+            The same results list
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        pending = [result for result in results
+                   if result.get('url') and not (result.get('width') and result.get('height'))]
+        if not pending:
+            return results
+        
+        urls = list(dict.fromkeys(result['url'] for result in pending))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls)))) as executor:
+            futures = {url: self._submit(executor, self.probe_image, url, timeout) for url in urls}
+            probed = {url: future.result() for url, future in futures.items()}
+        
+        for result in pending:
+            info = probed[result['url']]
+            if info:
+                for key, value in info.items():
+                    if not result.get(key):
+                        result[key] = value
+        return results
+    
+    def probe_image(self, url: str, timeout: float = 5) -> Optional[Dict]:
+        """
+        Read format, dimensions and byte size from the start of a remote image
+        
+        Args:
+            url: Image URL
+            timeout: Request timeout in seconds
+        
+        Returns:
+            Dictionary with 'format', 'width', 'height' and 'size' (total
+            bytes) where known, or None if the image could not be probed
+        """
+        with self._lock:
+            if url in self._probe_cache:
+                self._probe_cache.move_to_end(url)
+                info = self._probe_cache[url]
+                hit = True
+            else:
+                hit = False
+        self._event('cache_hit' if hit else 'cache_miss', kind='probe')
+        if hit:
+            return info
+        
+        info = None
+        try:
+            with self._stage('probe', url=url, host=urlparse(url).netloc) as attrs:
+                response = self.session.get(url, timeout=timeout, stream=True,
+                                            headers={'Range': f'bytes=0-{IMAGE_PROBE_BYTES - 1}'})
+                try:
+                    attrs['status'] = response.status_code
+                    response.raise_for_status()
+                    # Servers that ignore Range send the whole file; stop reading early
+                    data = b''
+                    for chunk in response.iter_content(4096):
+                        data += chunk
+                        if len(data) >= IMAGE_PROBE_BYTES:
+                            break
+                    attrs['bytes'] = len(data)
+                finally:
+                    response.close()
+            
+            info = parse_image_header(data)
+            if info is not None:
+                total = response.headers.get('Content-Range', '').rpartition('/')[2]
+                length = response.headers.get('Content-Length', '')
+                if response.status_code == 206 and total.isdigit():
+                    info['size'] = int(total)
+                elif response.status_code == 200 and length.isdigit():
+                    info['size'] = int(length)
+        except Exception as e:
+            logger.debug("Could not probe %s: %s", url, e)
+        
+        with self._lock:
+            self._probe_cache[url] = info
+            while len(self._probe_cache) > IMAGE_PROBE_CACHE_SIZE:
+                self._probe_cache.popitem(last=False)
+        return info
+    
+    def scrape_page_content(self, url: str, timeout: int = 10, extract: str = 'full') -> Optional[Dict]:
         """
         Scrape detailed content from a web page
         
         Args:
             url: URL of the page to scrape
-            timeout: Request timeout in seconds
+            timeout: Upper bound for the request timeouts in seconds; hosts
+                with a latency history get tighter ones (see HostTimeouts)
+            extract: 'full' for all document text, 'main' to keep only
+                the article body (navigation, footers and banners dropped), or
+                'head' for <head> metadata only (see fetch_head_metadata)
         
         Returns:
             Dictionary with extracted page data or None if failed
         """
         try:
-            response = self.session.get(url, timeout=timeout, allow_redirects=True)
-            response.raise_for_status()
+            return self._fetch_and_parse(url, extract, timeout)
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract comprehensive page data
-            page_data = {
+        except CircuitOpenError as e:
+            return {
                 'url': url,
-                'title': '',
-                'description': '',
-                'keywords': [],
-                'author': '',
-                'content': '',
-                'images': [],
-                'links': [],
-                'meta_tags': {},
-                'headings': {},
-                'text_content': '',
-                'language': '',
-                'charset': '',
-                'canonical_url': ''
+                'error': str(e),
+                'status': 'skipped'
             }
-            
-            # Extract title
-            if soup.title:
-                page_data['title'] = soup.title.string.strip() if soup.title.string else ''
-            
-            # Extract meta tags
-            for meta in soup.find_all('meta'):
-                name = meta.get('name', '').lower()
-                property_attr = meta.get('property', '').lower()
-                content = meta.get('content', '')
-                
-                if name == 'description' or property_attr == 'og:description':
-                    page_data['description'] = content
-                elif name == 'keywords':
-                    page_data['keywords'] = [k.strip() for k in content.split(',')]
-                elif name == 'author':
-                    page_data['author'] = content
-                elif property_attr == 'og:title':
-                    page_data['title'] = content if not page_data['title'] else page_data['title']
-                elif property_attr == 'og:url':
-                    page_data['canonical_url'] = content
-                
-                # Store all meta tags
-                if name:
-                    page_data['meta_tags'][name] = content
-                if property_attr:
-                    page_data['meta_tags'][property_attr] = content
-            
-            # Extract language and charset
-            html_tag = soup.find('html')
-            if html_tag:
-                page_data['language'] = html_tag.get('lang', '')
-            
-            meta_charset = soup.find('meta', charset=True)
-            if meta_charset:
-                page_data['charset'] = meta_charset.get('charset', '')
-            
-            # Extract headings
-            for level in range(1, 7):
-                headings = soup.find_all(f'h{level}')
-                page_data['headings'][f'h{level}'] = [h.get_text().strip() for h in headings]
-            
-            # Extract images
-            for img in soup.find_all('img'):
-                img_info = {
-                    'src': img.get('src', ''),
-                    'alt': img.get('alt', ''),
-                    'title': img.get('title', '')
-                }
-                if img_info['src']:
-                    page_data['images'].append(img_info)
-            
-            # Extract links
-            for link in soup.find_all('a', href=True):
-                page_data['links'].append({
-                    'url': link.get('href', ''),
-                    'text': link.get_text().strip()[:100]
-                })
-            
-            # Extract main text content (remove scripts and styles)
-            for script in soup(["script", "style", "meta", "link"]):
-                script.decompose()
-            
-            page_data['text_content'] = soup.get_text(separator=' ', strip=True)
-            page_data['content'] = page_data['text_content'][:5000]  # Limit content size
-            
-            return page_data
-            
         except Exception as e:
             return {
                 'url': url,
@@ -272,6 +1422,288 @@ class DuckDuckGoScraper:
                 'status': 'failed'
             }
     
+    def _fetch_and_parse(self, url: str, extract: str = 'full', timeout: float = 10) -> Dict:
+        """Fetch and parse one page, raising on failure"""
+        return self._parse_result(self._start_page(url, extract, timeout), extract)
+    
+    def _start_page(self, url: str, extract: str = 'full', timeout: float = 10) -> Future:
+        """Fetch a page and start parsing it; head-only pages are parsed while streaming"""
+        if extract == 'head':
+            future = Future()
+            future.set_result(self.fetch_head_metadata(url, timeout=timeout))
+            return future
+        content, final_url = self._fetch_body(url, timeout=timeout)
+        return self.submit_parse(url, content, extract=extract, final_url=final_url)
+    
+    def fetch_head_metadata(self, url: str, timeout: float = 10) -> Dict:
+        """
+        Read only a page's <head>: title, description, keywords, author, meta
+        tags, canonical URL, language and charset
+        
+        The body is streamed and parsed incrementally, and the download stops
+        at </head> (or <body>, or after HEAD_MAX_BYTES), so large pages cost
+        a few KB instead of a full download and BeautifulSoup tree.
+        
+        Args:
+            url: URL of the page
+            timeout: Upper bound for the request timeouts in seconds
+        
+        Returns:
+            Metadata dictionary with 'final_url', 'base_url', 'head_only' and
+            'bytes_read' (body bytes read before stopping)
+        
+        Raises:
+            CircuitOpenError, or the HTTP library's errors as in fetch_page
+        """
+        host = urlparse(url).netloc
+        try:
+            self.circuit_breaker.before_request(host)
+        except CircuitOpenError:
+            self._event('circuit_rejected', kind='fetch', host=host)
+            raise
+        
+        connect_timeout, read_timeout = self.host_timeouts.timeout(host, timeout)
+        parser = None
+        received = 0
+        charset = None
+        with self._stage('fetch', url=url, host=host, head=True) as attrs:
+            if self.http2:
+                import httpx
+                read_timeout_error = httpx.ReadTimeout
+            else:
+                from requests.exceptions import ReadTimeout as read_timeout_error
+            started = time.perf_counter()
+            try:
+                if self.http2:
+                    request = self.http_client.stream('GET', url, timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+                else:
+                    from contextlib import closing
+                    request = closing(self.session.get(url, timeout=(connect_timeout, read_timeout),
+                                                       allow_redirects=True, stream=True))
+                with request as response:
+                    # Headers have arrived: time to first byte, as fetch_page records it
+                    self.host_timeouts.record(host, time.perf_counter() - started)
+                    attrs['status'] = response.status_code
+                    if response.status_code >= 500:
+                        self._record_host_failure(host)
+                    else:
+                        self.circuit_breaker.record_success(host)
+                    response.raise_for_status()
+                    parser = HeadParser(url, final_url=str(response.url))
+                    
+                    header_charset = _charset_from_content_type(response.headers.get('Content-Type', ''))
+                    decoder = None
+                    sniffed = b''
+                    chunks = response.iter_bytes(8192) if self.http2 else response.iter_content(8192)
+                    for chunk in chunks:
+                        received += len(chunk)
+                        if decoder is None:
+                            # Hold back the first bytes until a <meta charset> could have been seen
+                            sniffed += chunk
+                            if len(sniffed) < CHARSET_SNIFF_BYTES:
+                                continue
+                            charset = _sniff_charset(sniffed, header_charset)
+                            decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+                            chunk = sniffed
+                        parser.feed(decoder.decode(chunk))
+                        if parser.done or received >= HEAD_MAX_BYTES:
+                            break
+                    if decoder is None and sniffed:
+                        charset = _sniff_charset(sniffed, header_charset)
+                        parser.feed(codecs.decode(sniffed, charset, errors='replace'))
+            except Exception as e:
+                if isinstance(e, read_timeout_error):
+                    # Widen the estimate so a slow host gets more time next time
+                    self.host_timeouts.record(host, read_timeout)
+                # HTTP errors were already counted when the status arrived
+                if 'status' not in attrs:
+                    self._record_host_failure(host)
+                raise
+            attrs['bytes'] = received
+            self.fetch_latency.record(time.perf_counter() - started)
+        
+        page_data = parser.result()
+        page_data['head_only'] = True
+        page_data['bytes_read'] = received
+        if not page_data['charset'] and charset:
+            page_data['charset'] = charset.replace('-sig', '')
+        return page_data
+    
+    def _submit(self, executor, fn, *args):
+        """Submit work to a thread pool, carrying over the caller's context (e.g. the active trace span)"""
+        context = contextvars.copy_context()
+        wrapper = context.get(task_wrapper)
+        if wrapper is not None:
+            return executor.submit(context.run, wrapper, fn, *args)
+        return executor.submit(context.run, fn, *args)
+    
+    def fetch_page(self, url: str, timeout: int = 10) -> bytes:
+        """
+        Download a page body
+        
+        Connect and read timeouts come from the host's observed latency
+        (self.host_timeouts), capped at timeout.
+        
+        Args:
+            url: URL of the page to fetch
+            timeout: Upper bound for the request timeouts in seconds
+        
+        Returns:
+            Raw response body
+        
+        Raises:
+            CircuitOpenError if the host has been failing (no request is made)
+            requests.RequestException (httpx.HTTPError with http2) on
+            network or HTTP errors
+        """
+        return self._fetch_body(url, timeout)[0]
+    
+    def _fetch_body(self, url: str, timeout: float = 10) -> Tuple[bytes, str]:
+        """fetch_page() that also returns the URL the body came from after redirects"""
+        host = urlparse(url).netloc
+        try:
+            self.circuit_breaker.before_request(host)
+        except CircuitOpenError:
+            self._event('circuit_rejected', kind='fetch', host=host)
+            raise
+        
+        connect_timeout, read_timeout = self.host_timeouts.timeout(host, timeout)
+        with self._stage('fetch', url=url, host=host) as attrs:
+            if self.http2:
+                import httpx
+                read_timeout_error = httpx.ReadTimeout
+            else:
+                from requests.exceptions import ReadTimeout as read_timeout_error
+            started = time.perf_counter()
+            try:
+                if self.http2:
+                    response = self.http_client.get(url, timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+                    attrs['http_version'] = response.http_version
+                else:
+                    response = self.session.get(url, timeout=(connect_timeout, read_timeout), allow_redirects=True)
+                # Time to first byte with requests; httpx also counts the body download
+                self.host_timeouts.record(host, response.elapsed.total_seconds())
+                attrs['status'] = response.status_code
+                attrs['bytes'] = len(response.content)
+            except Exception as e:
+                if isinstance(e, read_timeout_error):
+                    # Widen the estimate so a slow host gets more time next time
+                    self.host_timeouts.record(host, read_timeout)
+                self._record_host_failure(host)
+                raise
+            # 4xx means the host is up; only server errors count against it
+            if response.status_code >= 500:
+                self._record_host_failure(host)
+            else:
+                self.circuit_breaker.record_success(host)
+            response.raise_for_status()
+            self.fetch_latency.record(time.perf_counter() - started)
+            return response.content, str(response.url)
+    
+    def _record_host_failure(self, host: str):
+        if self.circuit_breaker.record_failure(host):
+            logger.warning("Circuit opened for %s; skipping it for %ss",
+                           host, self.circuit_breaker.reset_timeout)
+            self._event('circuit_open', kind='fetch', host=host)
+    
+    def submit_parse(self, url: str, content: bytes, extract: str = 'full',
+                     final_url: Optional[str] = None) -> Future:
+        """
+        Start parsing a downloaded body
+        
+        With parse_workers > 0 the body is sent to the process pool, so parsing
+        runs in parallel with fetching and with other requests instead of
+        holding the GIL; otherwise it is parsed right away in this thread.
+        
+        Args:
+            url: URL the body was fetched from
+            content: Raw response body
+            extract: Text extraction mode ('full' or 'main')
+            final_url: URL the body was served from after redirects
+        
+        Returns:
+            Future resolving to the page data dictionary
+        """
+        truncated = len(content) > self.max_parse_bytes
+        if truncated:
+            content = content[:self.max_parse_bytes]
+        
+        args = (url, content, extract, truncated, final_url)
+        pool = self._get_parse_pool()
+        if pool is not None:
+            try:
+                future = pool.submit(_parse_task, *args)
+            except BrokenExecutor:
+                self._discard_parse_pool(pool)
+            else:
+                # Kept so _parse_result() can parse in-process if the pool breaks
+                future.parse_args = args
+                future.parse_pool = pool
+                return future
+        return self._parse_inline(args)
+    
+    def _parse_inline(self, args: Tuple) -> Future:
+        """Parse in this thread; the returned future is already resolved"""
+        future = Future()
+        try:
+            with self._stage('parse', extract=args[2]):
+                future.set_result(_parse_task(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+    
+    def _parse_result(self, future: Future, extract: str) -> Dict:
+        """Wait for a parse started by submit_parse() and record the page's links"""
+        try:
+            if future.done():
+                page_data = future.result()
+            else:
+                with self._stage('parse', extract=extract, pool=True):
+                    page_data = future.result()
+        except BrokenExecutor:
+            # A worker died; start a fresh pool for later pages and parse this one here
+            logger.warning("Parse process pool broke; parsing %s in-process", future.parse_args[0])
+            self._discard_parse_pool(future.parse_pool)
+            page_data = self._parse_inline(future.parse_args).result()
+        if self.link_graph is not None and page_data.get('links'):
+            # Record the page under the URL it was served from; links resolve against <base href>
+            self.link_graph.add_page(page_data.get('final_url') or page_data['url'],
+                                     (link['url'] for link in page_data['links']),
+                                     base=page_data.get('base_url'))
+        return page_data
+    
+    def _get_parse_pool(self):
+        """Create the parse process pool on first use (and after it broke)"""
+        if self.parse_workers <= 0:
+            return None
+        if self._parse_pool is None:
+            with self._lock:
+                if self._parse_pool is None:
+                    import multiprocessing
+                    from concurrent.futures import ProcessPoolExecutor
+                    # Forking a multi-threaded process can copy locks held by other
+                    # threads into the children; start workers from a clean process
+                    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                                           mp_context=multiprocessing.get_context(method))
+        return self._parse_pool
+    
+    def _discard_parse_pool(self, pool):
+        """Drop a broken parse pool so the next parse starts a new one"""
+        with self._lock:
+            if self._parse_pool is pool:
+                self._parse_pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+    
+    def close(self):
+        """Shut down the parse process pool and the HTTP/2 client, if they were started"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+        if self._http_client is not None:
+            self._http_client.close()
+            self._http_client = None
+    
     def search_news(self, query: str, max_results: int = 10, region: str = 'us-en') -> List[Dict]:
         """
         Search for news articles on DuckDuckGo
@@ -286,11 +1718,13 @@ class DuckDuckGoScraper:
         """
         results = []
         try:
-            news_results = self.ddgs.news(
-                query,
-                max_results=max_results,
-                region=region
-            )
+            self._throttle('news')
+            with self._stage('ddgs', kind='news'):
+                news_results = list(self.ddgs.news(
+                    query,
+                    max_results=max_results,
+                    region=region
+                ))
             
             count = 0
             for result in news_results:
@@ -325,8 +1759,9 @@ class DuckDuckGoScraper:
             return results
             
         except Exception as e:
-            print(f"Error during news search: {e}")
-            traceback.print_exc()
+            if isinstance(e, _ratelimit_exception()):
+                self._event('rate_limit', kind='news')
+            logger.exception("Error during news search: %s", e)
             return []
     
     def search_videos(self, query: str, max_results: int = 10, region: str = 'us-en') -> List[Dict]:
@@ -343,11 +1778,13 @@ class DuckDuckGoScraper:
         """
         results = []
         try:
-            video_results = self.ddgs.videos(
-                query,
-                max_results=max_results,
-                region=region
-            )
+            self._throttle('videos')
+            with self._stage('ddgs', kind='videos'):
+                video_results = list(self.ddgs.videos(
+                    query,
+                    max_results=max_results,
+                    region=region
+                ))
             
             count = 0
             for result in video_results:
@@ -386,41 +1823,399 @@ class DuckDuckGoScraper:
             return results
             
         except Exception as e:
-            print(f"Error during video search: {e}")
-            traceback.print_exc()
+            if isinstance(e, _ratelimit_exception()):
+                self._event('rate_limit', kind='videos')
+            logger.exception("Error during video search: %s", e)
             return []
     
-    def enhance_results_with_page_content(self, results: List[Dict], max_pages: int = 5) -> List[Dict]:
+    def search_page(self, kind: str, query: str = '', page_size: int = 10, region: str = 'us-en',
+                    cursor: Optional[str] = None) -> Dict:
+        """
+        Fetch one page of results, continuing from a cursor
+        
+        The results already fetched for a search are kept server-side, so
+        later pages are served from them. When more are needed the upstream
+        request is grown geometrically (at least doubling), which keeps the
+        total upstream work linear in the number of results read.
+        
+        Args:
+            kind: 'text', 'news', 'videos' or 'images'
+            query: Search query string (ignored when a cursor is given)
+            page_size: Number of results per page
+            region: Region/language code (ignored when a cursor is given)
+            cursor: Cursor returned by a previous call, or None for page one
+        
+        Returns:
+            Dictionary with 'results', 'offset' and 'cursor' (None on the last page)
+        
+        Raises:
+            KeyError if the cursor is unknown or expired
+            ValueError for an unknown search kind
+        """
+        if cursor:
+            session, offset = self.cursors.resolve(cursor)
+        else:
+            if kind not in ('text', 'news', 'videos', 'images'):
+                raise ValueError(f"Unknown search kind: {kind}")
+            session, offset = self.cursors.create(kind, query, region), 0
+        
+        end = offset + page_size
+        with session['lock']:
+            if len(session['results']) < end and not session['exhausted']:
+                self._event('cache_miss', kind=session['kind'])
+                requested = max(end, 2 * session['requested'])
+                fresh = self.search_kind(session['kind'], session['query'], requested, session['region'])
+                # A short answer after a longer one is an upstream error, not the end
+                if len(fresh) >= len(session['results']):
+                    session['results'] = fresh
+                    session['requested'] = requested
+                    session['exhausted'] = len(fresh) < requested
+            else:
+                self._event('cache_hit', kind=session['kind'])
+            
+            page = session['results'][offset:end]
+            has_more = len(session['results']) > end or not session['exhausted']
+        
+        return {
+            'results': page,
+            'offset': offset,
+            'cursor': CursorStore.encode(session, end) if page and has_more else None,
+        }
+    
+    def search_kind(self, kind: str, query: str, max_results: int = 10, region: str = 'us-en') -> List[Dict]:
+        """
+        Run the search method for a result kind
+        
+        Args:
+            kind: 'text', 'news', 'videos' or 'images' (region is ignored for images)
+            query: Search query string
+            max_results: Maximum number of results
+            region: Region/language code
+        
+        Returns:
+            List of result dictionaries
+        """
+        if kind == 'images':
+            return self.search_images(query, max_results=max_results)
+        if kind == 'news':
+            return self.search_news(query, max_results=max_results, region=region)
+        if kind == 'videos':
+            return self.search_videos(query, max_results=max_results, region=region)
+        return self.search(query, max_results=max_results, region=region)
+    
+    def search_all(self, query: str, max_results: int = 10, region: str = 'us-en',
+                   kinds: Optional[List[str]] = None) -> Dict:
+        """
+        Run the text, news, videos and images searches for a query concurrently
+        
+        All searches go through the scraper's rate limiter, so a shared limit
+        still holds; total latency is that of the slowest vertical instead of
+        the sum of all four.
+        
+        Args:
+            query: Search query string
+            max_results: Maximum number of results per vertical
+            region: Region/language code (ignored for images)
+            kinds: Subset of SEARCH_KINDS to run (default: all)
+        
+        Returns:
+            Dictionary with 'results' (kind -> result list), 'timings'
+            (kind -> seconds) and 'errors' (kind -> message, only for
+            verticals that failed)
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        
+        kinds = [kind for kind in SEARCH_KINDS if kinds is None or kind in kinds]
+        
+        def run(kind):
+            errors = []
+            _stage_errors.set(errors)
+            started = time.perf_counter()
+            try:
+                results = self.search_kind(kind, query, max_results=max_results, region=region)
+            except Exception as e:
+                results = []
+                errors.append(('search', e))
+            return results, time.perf_counter() - started, errors
+        
+        response = {'results': {}, 'timings': {}, 'errors': {}}
+        if not kinds:
+            return response
+        with ThreadPoolExecutor(max_workers=len(kinds)) as executor:
+            futures = {kind: self._submit(executor, run, kind) for kind in kinds}
+            for kind, future in futures.items():
+                results, duration, errors = future.result()
+                response['results'][kind] = results
+                response['timings'][kind] = round(duration, 3)
+                # Errors a vertical recovered from (e.g. a retried rate limit) are not failures
+                if errors and not results:
+                    _, error = errors[-1]
+                    response['errors'][kind] = f"{type(error).__name__}: {error}"
+        return response
+    
+    def rerank_results(self, results: List[Dict], query: str) -> List[Dict]:
+        """
+        Order results by BM25 relevance to the query
+        
+        Scores title, snippet and any scraped page text; each result gets a
+        'bm25_score'. Needs numpy and scipy (see text_analysis).
+        
+        Returns:
+            New list of the same result dictionaries, best first
+        """
+        import text_analysis
+        
+        with self._stage('rerank', results=len(results)):
+            return text_analysis.rerank(results, query)
+    
+    def cluster_results(self, results: List, num_clusters: Optional[int] = None,
+                        include_page: bool = True) -> List[Dict]:
+        """
+        Group results into labeled topics
+        
+        Uses TF-IDF vectors of title, snippet and any scraped page text,
+        clustered with spherical k-means. Needs numpy and scipy (see
+        text_analysis).
+        
+        Args:
+            results: Result dictionaries, or a batch of result lists; for a
+                batch every clustered result is a copy carrying 'result_set',
+                the index of the list it came from
+            num_clusters: Number of topics (default: about sqrt(n / 2))
+            include_page: Also use scraped page text when present
+        
+        Returns:
+            Clusters, largest first, as {'id', 'label', 'terms', 'size',
+            'results'} dictionaries with the results closest to the topic first
+        """
+        import text_analysis
+        
+        if results and isinstance(results[0], list):
+            results = [dict(result, result_set=index)
+                       for index, result_set in enumerate(results) for result in result_set]
+        with self._stage('cluster', results=len(results)):
+            clusters = text_analysis.cluster_results(results, num_clusters, include_page=include_page)
+        for cluster in clusters:
+            cluster['results'] = [results[index] for index in cluster.pop('indices')]
+        return clusters
+    
+    def enhance_results_with_page_content(self, results: List[Dict], max_pages: int = 5,
+                                          extract: str = 'full', time_budget: Optional[float] = None,
+                                          deadline: Optional[float] = None,
+                                          max_workers: int = 4,
+                                          hedge_percentile: Optional[float] = None,
+                                          hedge_budget: float = 0.2,
+                                          rerank_query: Optional[str] = None) -> List[Dict]:
         """
         Enhance search results by scraping page content from URLs
         
+        Without a time limit pages are fetched one after another with a
+        polite delay. With a link graph, pages it ranks highest by PageRank
+        are fetched first; results keep their order. With time_budget or
+        deadline, up to max_workers pages
+        are fetched concurrently, a failed page is replaced by the next
+        candidate, and when time runs out the stragglers are abandoned:
+        whatever finished is returned, and results that were still pending
+        get page_content_status = DEADLINE_EXCEEDED (see is_partial()).
+        
+        With hedge_percentile also set, a page that takes longer than that
+        percentile of recent fetch times gets a backup request (the next
+        candidate, or the same URL again if none is left) and whichever
+        succeeds first fills the slot.
+        
         Args:
             results: List of search result dictionaries
             max_pages: Maximum number of pages to scrape (default: 5)
+            extract: Text extraction mode passed to scrape_page_content
+            time_budget: Seconds available for the whole deep scrape
+            deadline: Absolute time.monotonic() value to finish by
+            max_workers: Concurrent fetches when a time limit is set
+            hedge_percentile: Enable hedging after this percentile (e.g. 95)
+                of recent fetch latencies; only used with a time limit
+            hedge_budget: Extra requests allowed for hedging, as a fraction
+                of max_pages (at least one)
+            rerank_query: Re-order the enhanced results by BM25 relevance to
+                this query, scoring the scraped page text as well
         
         Returns:
             List of enhanced result dictionaries with page content
         """
-        enhanced = []
+        if time_budget is not None or deadline is not None:
+            if time_budget is not None:
+                budget_deadline = time.monotonic() + time_budget
+                deadline = budget_deadline if deadline is None else min(deadline, budget_deadline)
+            enhanced = self._enhance_within_deadline(results, max_pages, extract, deadline, max_workers,
+                                                     hedge_percentile, hedge_budget)
+            return self.rerank_results(enhanced, rerank_query) if rerank_query else enhanced
+        
+        enhanced = list(results)
+        pending = []
         scraped = 0
         
-        for result in results:
-            if scraped >= max_pages:
-                enhanced.append(result)
-                continue
-            
-            url = result.get('url', '')
-            if url:
-                print(f"  Scraping content from: {url[:60]}...")
-                page_content = self.scrape_page_content(url)
-                if page_content and 'error' not in page_content:
-                    result['page_content'] = page_content
+        with self._stage('enhance', max_pages=max_pages, candidates=len(results)) as attrs:
+            # Fetch stage: parses are handed off as soon as a body arrives, so
+            # with a process pool they overlap with the remaining downloads
+            for result in self._fetch_order(results):
+                if scraped >= max_pages:
+                    break
+                
+                url = result['url']
+                logger.info("  Scraping content from: %s...", url[:60])
+                try:
+                    future = self._start_page(url, extract)
+                except Exception as e:
+                    logger.debug("Fetch failed for %s: %s", url, e)
+                else:
+                    pending.append((result, future))
                     scraped += 1
                     time.sleep(1)  # Be respectful with requests
+            
+            # Parse stage: collect the extracted page data
+            for result, future in pending:
+                try:
+                    result['page_content'] = self._parse_result(future, extract)
+                except Exception as e:
+                    logger.warning("Parsing failed for %s: %s", result.get('url', ''), e)
+            
+            attrs['scraped'] = scraped
+        
+        return self.rerank_results(enhanced, rerank_query) if rerank_query else enhanced
+    
+    def _fetch_order(self, results: List[Dict]) -> List[Dict]:
+        """Results with a URL, most central pages in the link graph first"""
+        candidates = [result for result in results if result.get('url')]
+        if self.link_graph is None or not len(self.link_graph) or len(candidates) < 2:
+            return candidates
+        with self._stage('prioritize', candidates=len(candidates)):
+            return self.link_graph.prioritize(candidates, key=lambda result: result['url'])
+    
+    def _enhance_within_deadline(self, results: List[Dict], max_pages: int, extract: str,
+                                 deadline: float, max_workers: int,
+                                 hedge_percentile: Optional[float] = None,
+                                 hedge_budget: float = 0.2) -> List[Dict]:
+        """
+        Concurrent deep scrape that stops at a time.monotonic() deadline
         
-            enhanced.append(result)
+        Each page slot tracks its in-flight attempts; with hedging a slot whose
+        download is still running past the threshold gets one backup attempt
+        and is filled by whichever succeeds first. The threshold comes from
+        fetch times, so slots already parsing are never hedged.
+        """
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        
+        candidates = self._fetch_order(results)
+        next_candidate = 0
+        slots = []
+        owners = {}
+        scraped = 0
+        hedges = 0
+        
+        hedge_after = None
+        hedge_limit = 0
+        if hedge_percentile is not None:
+            hedge_after = self.fetch_latency.percentile(hedge_percentile) or HEDGE_DEFAULT_DELAY
+            hedge_limit = max(1, int(hedge_budget * max_pages))
+        
+        with self._stage('enhance', max_pages=max_pages, candidates=len(results),
+                         budget=round(deadline - time.monotonic(), 3)) as attrs:
+            executor = ThreadPoolExecutor(max_workers=max(1, max_workers) + hedge_limit)
+            
+            def fetch_and_parse(slot, url, timeout):
+                if extract == 'head':
+                    # Head-only pages are parsed while they stream in
+                    future = self._start_page(url, extract, timeout)
+                else:
+                    content, final_url = self._fetch_body(url, timeout=timeout)
+                    # Downloaded: from here on only parsing is left, which hedging can't speed up
+                    slot['fetched'] = True
+                    future = self.submit_parse(url, content, extract=extract, final_url=final_url)
+                return self._parse_result(future, extract)
+            
+            def attempt(slot, result, remaining):
+                future = self._submit(executor, fetch_and_parse, slot, result['url'], min(10, remaining))
+                slot['attempts'][future] = result
+                owners[future] = slot
+            
+            try:
+                while True:
+                    now = time.monotonic()
+                    remaining = deadline - now
+                    # Keep just enough slots in flight to reach max_pages
+                    while (remaining > 0 and next_candidate < len(candidates)
+                           and len(slots) < max_workers and scraped + len(slots) < max_pages):
+                        result = candidates[next_candidate]
+                        next_candidate += 1
+                        logger.info("  Scraping content from: %s...", result['url'][:60])
+                        slot = {'attempts': {}, 'started': now, 'hedged': False, 'fetched': False}
+                        slots.append(slot)
+                        attempt(slot, result, remaining)
+                    
+                    if not slots or remaining <= 0:
+                        break
+                    
+                    # Back up slots that have run past the hedge threshold
+                    timeout = remaining
+                    if hedge_after is not None:
+                        for slot in slots:
+                            if slot['hedged'] or slot['fetched']:
+                                continue
+                            due = slot['started'] + hedge_after - now
+                            if due > 0:
+                                timeout = min(timeout, due)
+                            elif hedges < hedge_limit:
+                                slot['hedged'] = True
+                                hedges += 1
+                                if next_candidate < len(candidates):
+                                    backup = candidates[next_candidate]
+                                    next_candidate += 1
+                                    reason = 'next'
+                                else:
+                                    backup = next(iter(slot['attempts'].values()))
+                                    reason = 'duplicate'
+                                self._event('hedge', url=backup['url'], reason=reason,
+                                            after=round(hedge_after, 3))
+                                attempt(slot, backup, remaining)
+                    
+                    done, _ = wait(list(owners), timeout=timeout, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        slot = owners.pop(future, None)
+                        if slot is None:
+                            # A sibling of this attempt already filled its slot
+                            continue
+                        result = slot['attempts'].pop(future)
+                        try:
+                            result['page_content'] = future.result()
+                        except Exception as e:
+                            logger.debug("Scrape failed for %s: %s", result['url'], e)
+                            if not slot['attempts']:
+                                slots.remove(slot)
+                            continue
+                        scraped += 1
+                        # The slot is filled; abandon its other attempt
+                        for other, other_result in slot['attempts'].items():
+                            owners.pop(other, None)
+                            if other_result is not result:
+                                other_result['page_content_status'] = HEDGE_ABANDONED
+                        slots.remove(slot)
+            finally:
+                # Don't wait for stragglers; their request timeouts end them shortly
+                executor.shutdown(wait=False, cancel_futures=True)
+            
+            # Flag the pages we still wanted but ran out of time for
+            unfinished = list({id(result): result for slot in slots
+                               for result in slot['attempts'].values()}.values())
+            shortfall = max_pages - scraped - len(slots)
+            if remaining <= 0 and shortfall > 0:
+                unfinished += candidates[next_candidate:next_candidate + shortfall]
+            for result in unfinished:
+                result['page_content_status'] = DEADLINE_EXCEEDED
+            
+            attrs['scraped'] = scraped
+            attrs['partial'] = bool(unfinished)
+            if hedge_after is not None:
+                attrs['hedges'] = hedges
         
-        return enhanced
+        return results
     
     def save_results(self, results: List[Dict], filename: str = 'search_results.json'):
         """
@@ -433,9 +2228,9 @@ class DuckDuckGoScraper:
         try:
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(results, f, indent=2, ensure_ascii=False)
-            print(f"Results saved to {filename}")
+            logger.info("Results saved to %s", filename)
         except Exception as e:
-            print(f"Error saving results: {e}")
+            logger.error("Error saving results: %s", e)
     
     def print_results(self, results: List[Dict], detailed: bool = False):
         """
@@ -760,8 +2555,200 @@ def deep_scrape_ui(scraper: DuckDuckGoScraper):
     input("\nPress Enter to continue...")
 
 
-def main():
-    """Main interactive UI"""
+def read_queries(sources: List[str]):
+    """
+    Yield queries from files ('-' for stdin), one per line
+    
+    Blank lines and lines starting with '#' are skipped.
+    """
+    for source in sources:
+        f = sys.stdin if source == '-' else open(source, 'r', encoding='utf-8')
+        try:
+            for line in f:
+                query = line.strip()
+                if query and not query.startswith('#'):
+                    yield query
+        finally:
+            if f is not sys.stdin:
+                f.close()
+
+
+def run_batch_query(scraper: DuckDuckGoScraper, args, index: int, query: str) -> Dict:
+    """
+    Run one query of a batch
+    
+    Returns:
+        NDJSON record with 'index', 'query', 'kind', 'status' ('ok', 'empty'
+        or 'error'), 'count', 'elapsed', 'results' and, on failure, 'error'
+    """
+    errors = []
+    _stage_errors.set(errors)
+    started = time.perf_counter()
+    record = {'index': index, 'query': query, 'kind': args.command}
+    try:
+        if args.command == 'images':
+            results = scraper.search_images(query, max_results=args.max_results, probe=args.probe)
+        elif args.command in ('text', 'deep'):
+            results = scraper.search(query, max_results=args.max_results, region=args.region,
+                                     rerank=args.rerank and args.command == 'text')
+            if args.command == 'deep' and results:
+                results = scraper.enhance_results_with_page_content(
+                    results, max_pages=args.max_pages, extract=args.extract,
+                    time_budget=args.time_budget, rerank_query=query if args.rerank else None)
+        else:
+            results = scraper.search_kind(args.command, query, max_results=args.max_results, region=args.region)
+    except Exception as e:
+        results = []
+        errors.append(('search', e))
+    
+    record['status'] = 'ok' if results else 'error' if errors else 'empty'
+    if errors and not results:
+        _, error = errors[-1]
+        record['error'] = f"{type(error).__name__}: {error}"
+    record['count'] = len(results)
+    record['elapsed'] = round(time.perf_counter() - started, 3)
+    record['results'] = results
+    return record
+
+
+class BatchProgress:
+    """Progress summary of a batch run, written to stderr"""
+    
+    def __init__(self, stream=None, interval: float = 1.0):
+        self.stream = stream or sys.stderr
+        self.interval = interval
+        self.live = self.stream.isatty()
+        self.started = time.monotonic()
+        self.reported = 0.0
+        self.counts = {'ok': 0, 'empty': 0, 'error': 0}
+        self.results = 0
+    
+    def update(self, record: Dict, submitted: int):
+        self.counts[record['status']] += 1
+        self.results += record['count']
+        now = time.monotonic()
+        if now - self.reported >= self.interval:
+            self.reported = now
+            self._write(self.line(submitted), final=False)
+    
+    def line(self, submitted: int) -> str:
+        done = sum(self.counts.values())
+        elapsed = time.monotonic() - self.started
+        return (f"{done}/{submitted} queries, {self.counts['ok']} ok, {self.counts['empty']} empty, "
+                f"{self.counts['error']} failed, {self.results} results, "
+                f"{done / elapsed if elapsed else 0.0:.1f} queries/s, {elapsed:.1f}s")
+    
+    def finish(self, submitted: int):
+        self._write(self.line(submitted), final=True)
+    
+    def _write(self, line: str, final: bool):
+        if self.live:
+            # Rewrite one line on a terminal; plain lines in logs
+            self.stream.write(f"\r\033[K{line}" + ("\n" if final else ""))
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def batch_main(argv: List[str]) -> int:
+    """
+    Non-interactive command line mode
+    
+    Reads queries from arguments, files or stdin, runs them concurrently
+    under a shared rate limit, streams one NDJSON record per query to stdout
+    as it finishes, and reports progress on stderr.
+    
+    Returns:
+        Exit code: 0, or 1 if any query failed
+    """
+    import argparse
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    
+    parser = argparse.ArgumentParser(
+        prog='scrape.py',
+        description='Run DuckDuckGo searches in batch and write NDJSON to stdout. '
+                    'Run without arguments for the interactive menu.')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('queries', nargs='*', help='Queries (default: read from --file)')
+    common.add_argument('-f', '--file', action='append', dest='files',
+                        help="File with one query per line, '-' for stdin (default: stdin); repeatable")
+    common.add_argument('-n', '--max-results', type=int, default=10, help='Results per query (default: 10)')
+    common.add_argument('-w', '--workers', type=int, default=4, help='Concurrent queries (default: 4)')
+    common.add_argument('--rate', type=float, default=1.0,
+                        help='DuckDuckGo calls per second across all workers (default: 1)')
+    common.add_argument('--burst', type=int, default=1, help='Calls allowed back to back (default: 1)')
+    common.add_argument('-q', '--quiet', action='store_true', help='No progress summary on stderr')
+    common.set_defaults(rerank=False, probe=False)
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    for kind, description in (('text', 'Text search'), ('news', 'News search'), ('videos', 'Video search')):
+        command = commands.add_parser(kind, parents=[common], help=description)
+        command.add_argument('--region', default='us-en', help='Region/language code (default: us-en)')
+    commands.choices['text'].add_argument('--rerank', action='store_true',
+                                          help='Order results by BM25 relevance (needs numpy and scipy)')
+    images = commands.add_parser('images', parents=[common], help='Image search')
+    images.add_argument('--probe', action='store_true', help='Fill in missing image sizes and formats')
+    deep = commands.add_parser('deep', parents=[common], help='Text search plus page content')
+    deep.add_argument('--region', default='us-en', help='Region/language code (default: us-en)')
+    deep.add_argument('-p', '--max-pages', type=int, default=3, help='Pages scraped per query (default: 3)')
+    deep.add_argument('--extract', default='full', choices=['full', 'main', 'head'],
+                      help='Page text extraction mode (default: full)')
+    deep.add_argument('--time-budget', type=float, default=None,
+                      help='Seconds allowed for each deep scrape (default: no limit)')
+    deep.add_argument('--rerank', action='store_true',
+                      help='Order results by BM25 relevance including page text (needs numpy and scipy)')
+    
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.rate <= 0:
+        parser.error('--workers must be at least 1 and --rate positive')
+    logging.basicConfig(level=logging.WARNING, format='%(message)s', stream=sys.stderr)
+    
+    queries = iter(args.queries) if args.queries else read_queries(args.files or ['-'])
+    scraper = DuckDuckGoScraper(rate_limiter=RateLimiter(args.rate, args.burst))
+    progress = None if args.quiet else BatchProgress()
+    failed = False
+    submitted = 0
+    
+    def emit(record):
+        nonlocal failed
+        failed = failed or record['status'] == 'error'
+        sys.stdout.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        sys.stdout.flush()
+        if progress:
+            progress.update(record, submitted)
+    
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            pending = set()
+            # Queries are read lazily and only a few are queued ahead of the
+            # workers, so huge or streamed query lists don't pile up in memory
+            for query in queries:
+                pending.add(scraper._submit(executor, run_batch_query, scraper, args, submitted, query))
+                submitted += 1
+                if len(pending) >= args.workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        emit(future.result())
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    emit(future.result())
+    except KeyboardInterrupt:
+        failed = True
+    finally:
+        if progress:
+            progress.finish(submitted)
+        scraper.close()
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None):
+    """Main interactive UI, or the batch CLI when arguments are given (see batch_main)"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        sys.exit(batch_main(argv))
+    
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
     print_header()
     
     try:
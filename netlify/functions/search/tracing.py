@@ -0,0 +1,344 @@
+"""
+Request tracing for the DuckDuckGo scraper
+Structured spans that follow a request from the Flask or Netlify entry point
+through DDGS calls, page fetches and parsing, exported as JSON lines to a
+local file or to an OTLP/HTTP collector.
+
+Configure with the TRACE_EXPORT environment variable:
+    TRACE_EXPORT=file:/tmp/spans.jsonl
+    TRACE_EXPORT=otlp:http://localhost:4318
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from scrape import ScraperListener
+
+logger = logging.getLogger(__name__)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+def current_span():
+    """Return the active span in this context, or None"""
+    return _current_span.get()
+
+
+def parse_traceparent(header: Optional[str]):
+    """
+    Parse a W3C traceparent header
+
+    Returns:
+        (trace_id, parent_span_id) tuple, or (None, None) if absent or invalid
+    """
+    if not header:
+        return None, None
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    return parts[1], parts[2]
+
+
+class Span:
+    """A timed operation within a trace"""
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes)
+        self.events = []
+        self.start_time = time.time()
+        self.end_time = None
+        self.error = None
+        self._started = time.perf_counter()
+        self._duration = None
+
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value for propagating this span"""
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def set_attribute(self, key: str, value):
+        """Set or overwrite a span attribute"""
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict] = None):
+        """Record a point-in-time event on the span"""
+        self.events.append({'name': name, 'time': time.time(), 'attributes': attributes or {}})
+
+    def end(self, error: Optional[BaseException] = None):
+        """Close the span, recording an exception if one was raised"""
+        self._duration = time.perf_counter() - self._started
+        self.end_time = self.start_time + self._duration
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict:
+        """JSON-serializable representation used by the file exporter"""
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start_time': self.start_time,
+            'duration_ms': round(self._duration * 1000, 3) if self._duration is not None else None,
+            'status': 'error' if self.error else 'ok',
+            'error': self.error,
+            'attributes': self.attributes,
+            'events': self.events,
+        }
+
+
+def _otlp_value(value) -> Dict:
+    """Encode an attribute value as an OTLP AnyValue"""
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_attributes(attributes: Dict) -> List[Dict]:
+    return [{'key': key, 'value': _otlp_value(value)} for key, value in attributes.items()]
+
+
+class FileExporter:
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def export(self, spans: List[Span]):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False, default=str) + '\n')
+
+
+class OTLPExporter:
+    """Sends finished spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str = 'ddg-scraper', timeout: float = 5.0):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Span]):
+        import requests
+
+        otlp_spans = []
+        for span in spans:
+            otlp_spans.append({
+                'traceId': span.trace_id,
+                'spanId': span.span_id,
+                'parentSpanId': span.parent_id or '',
+                'name': span.name,
+                'kind': 1,
+                'startTimeUnixNano': str(int(span.start_time * 1e9)),
+                'endTimeUnixNano': str(int((span.end_time or span.start_time) * 1e9)),
+                'attributes': _otlp_attributes(span.attributes),
+                'events': [{
+                    'name': event['name'],
+                    'timeUnixNano': str(int(event['time'] * 1e9)),
+                    'attributes': _otlp_attributes(event['attributes']),
+                } for event in span.events],
+                'status': {'code': 2, 'message': span.error} if span.error else {'code': 1},
+            })
+        payload = {'resourceSpans': [{
+            'resource': {'attributes': _otlp_attributes({'service.name': self.service_name})},
+            'scopeSpans': [{'scope': {'name': 'scrape'}, 'spans': otlp_spans}],
+        }]}
+        requests.post(self.url, json=payload, timeout=self.timeout)
+
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to an exporter
+
+    Export happens on a background thread so request latency is not affected;
+    call flush() before a serverless invocation returns.
+    """
+
+    def __init__(self, exporter, batch_size: int = 64):
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='span-exporter', daemon=True)
+        self._thread.start()
+
+    def start_span(self, name: str, attributes: Optional[Dict] = None,
+                   traceparent: Optional[str] = None):
+        """
+        Start a span as a child of the active span (or of traceparent)
+
+        Returns:
+            (span, token) - pass both to end_span()
+        """
+        parent = _current_span.get()
+        trace_id, parent_id = parse_traceparent(traceparent)
+        if trace_id is None:
+            if parent is not None:
+                trace_id, parent_id = parent.trace_id, parent.span_id
+            else:
+                trace_id = secrets.token_hex(16)
+        span = Span(name, trace_id, parent_id, attributes or {})
+        return span, _current_span.set(span)
+
+    def end_span(self, span: Span, token, error: Optional[BaseException] = None):
+        """Finish a span started with start_span() and queue it for export"""
+        span.end(error)
+        if token is not None:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # Token was created in another context; just clear the active span
+                _current_span.set(None)
+        self._queue.put(span)
+
+    @contextmanager
+    def span(self, name: str, traceparent: Optional[str] = None, **attributes):
+        """Context manager form of start_span()/end_span()"""
+        span, token = self.start_span(name, attributes, traceparent)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            self.end_span(span, token, error)
+
+    def flush(self, timeout: float = 5.0):
+        """Block until queued spans are exported (or the timeout passes)"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.exporter.export(batch)
+            except Exception as e:
+                logger.warning("Span export failed: %s", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+class TracingListener(ScraperListener):
+    """Turns DuckDuckGoScraper stages into child spans of the active span"""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def stage_started(self, name: str, attrs: Dict):
+        span, token = self.tracer.start_span(name, attrs)
+        with self._lock:
+            self._open[id(attrs)] = (span, token)
+
+    def stage_finished(self, name: str, duration: float, attrs: Dict, error: Optional[BaseException]):
+        with self._lock:
+            span, token = self._open.pop(id(attrs), (None, None))
+        if span is None:
+            return
+        # Attributes may have been added while the stage ran (status, bytes, ...)
+        span.attributes.update(attrs)
+        self.tracer.end_span(span, token, error)
+
+    def event(self, name: str, attrs: Dict):
+        span = _current_span.get()
+        if span is not None:
+            span.add_event(name, attrs)
+
+
+class SpanLogHandler(logging.Handler):
+    """Attaches log records (with exception details) to the active span as events"""
+
+    def emit(self, record: logging.LogRecord):
+        span = _current_span.get()
+        if span is None:
+            return
+        attributes = {'level': record.levelname, 'logger': record.name, 'message': record.getMessage()}
+        if record.exc_info and record.exc_info[0] is not None:
+            attributes['exception.type'] = record.exc_info[0].__name__
+            attributes['exception.stacktrace'] = logging.Formatter().formatException(record.exc_info)
+        span.add_event('log', attributes)
+
+
+def configure_from_env(env_var: str = 'TRACE_EXPORT') -> Optional[Tracer]:
+    """
+    Build a Tracer from an environment variable
+
+    Accepts 'file:<path>' or 'otlp:<collector URL>'. Also attaches a
+    SpanLogHandler so scraper log records show up on the active span.
+
+    Returns:
+        Tracer, or None if tracing is not configured
+    """
+    spec = os.environ.get(env_var, '').strip()
+    if not spec:
+        return None
+    kind, _, target = spec.partition(':')
+    if kind == 'file':
+        exporter = FileExporter(target or 'spans.jsonl')
+    elif kind == 'otlp':
+        exporter = OTLPExporter(target or 'http://localhost:4318')
+    else:
+        logger.warning("Unknown %s value %r; tracing disabled", env_var, spec)
+        return None
+
+    logging.getLogger('scrape').addHandler(SpanLogHandler())
+    return Tracer(exporter)
+
+
+def init_app(app, tracer: Tracer):
+    """
+    Trace every Flask request as a root span
+
+    Honors an incoming traceparent header and returns the trace id in
+    X-Trace-Id so clients can look up the timeline for their request.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _start_request_span():
+        g.trace_span, g.trace_token = tracer.start_span(
+            'http.request',
+            {'http.method': request.method, 'http.route': request.path},
+            traceparent=request.headers.get('traceparent')
+        )
+
+    @app.after_request
+    def _tag_response(response):
+        span = g.get('trace_span')
+        if span is not None:
+            span.set_attribute('http.status_code', response.status_code)
+            response.headers['X-Trace-Id'] = span.trace_id
+        return response
+
+    @app.teardown_request
+    def _end_request_span(error=None):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            tracer.end_span(span, g.pop('trace_token', None), error)
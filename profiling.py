@@ -0,0 +1,333 @@
+"""
+On-demand CPU profiling for the Flask app
+Admin-only per-request cProfile capture and a low-overhead sampling profiler
+
+Profiling is disabled unless PROFILE_ADMIN_TOKEN is set; every profiling
+request must send the same value in the X-Admin-Token header.
+"""
+
+import cProfile
+import hmac
+import io
+import math
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import partial
+from typing import List, Optional
+
+from flask import Response, g, jsonify, request
+
+# Sampling interval bounds in seconds; shorter intervals would busy-spin the sampler thread
+MIN_SAMPLER_INTERVAL = 0.001
+MAX_SAMPLER_INTERVAL = 10.0
+
+
+def _is_admin() -> bool:
+    """Check the X-Admin-Token header against PROFILE_ADMIN_TOKEN"""
+    expected = os.environ.get('PROFILE_ADMIN_TOKEN', '')
+    supplied = request.headers.get('X-Admin-Token', '')
+    return bool(expected) and hmac.compare_digest(expected, supplied)
+
+
+def _positive_int_arg(name: str, default: Optional[int] = None) -> Optional[int]:
+    """
+    Read a positive integer query parameter
+
+    Raises:
+        ValueError if the value is not a positive integer
+    """
+    value = request.args.get(name)
+    if not value:
+        return default
+    number = int(value)
+    if number < 1:
+        raise ValueError(f"{name} must be a positive integer")
+    return number
+
+
+def format_stats(path: str, sort: str = 'cumulative', limit: int = 40,
+                 focus: Optional[str] = None) -> str:
+    """
+    Render a saved profile as text
+
+    Args:
+        path: .prof file written by cProfile
+        sort: pstats sort key (cumulative, tottime, calls, ...)
+        limit: Number of rows to print
+        focus: Optional function name regex; prints its call tree (callees)
+            instead of the flat table, e.g. 'enhance_results_with_page_content'
+
+    Returns:
+        pstats report as a string
+    """
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort)
+    if focus:
+        stats.print_callees(focus, limit)
+    else:
+        stats.print_stats(limit)
+    return out.getvalue()
+
+
+def profiled_call(profiles: List[cProfile.Profile], fn, *args):
+    """
+    Run fn(*args) in this thread under its own cProfile.Profile, appended to profiles
+
+    cProfile only sees the thread that enabled it, so pool threads working
+    for a profiled request need one each. If another profiler is already
+    active in this thread (or process-wide, on Python 3.12+), fn runs as is.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return fn(*args)
+    try:
+        return fn(*args)
+    finally:
+        profiler.disable()
+        profiles.append(profiler)
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that samples every thread's stack on an interval
+
+    Samples are aggregated as folded stacks ("outer;inner;leaf count"), the
+    input format of flamegraph.pl and speedscope. At the default 100 Hz the
+    overhead is a few percent of one core.
+    """
+
+    def __init__(self, interval: float = 0.01, max_stacks: int = 10000):
+        self.interval = interval
+        self.max_stacks = max_stacks
+        self.samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: Optional[float] = None):
+        """Start sampling in a background thread (no-op if already running)"""
+        if self.running:
+            return
+        if interval:
+            self.interval = interval
+        self._stop.clear()
+        self.started_at = time.time()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling; collected samples are kept until reset()"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        """Discard collected samples"""
+        with self._lock:
+            self.samples.clear()
+            self.sample_count = 0
+            self.started_at = time.time() if self.running else None
+
+    def folded(self, limit: Optional[int] = None) -> str:
+        """Collected samples as folded stacks, most frequent first"""
+        with self._lock:
+            items = self.samples.most_common(limit)
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + '\n'
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                stacks.append(';'.join(reversed(stack)))
+            with self._lock:
+                for stack in stacks:
+                    if stack in self.samples or len(self.samples) < self.max_stacks:
+                        self.samples[stack] += 1
+                self.sample_count += 1
+
+
+sampler = SamplingProfiler()
+
+
+def init_app(app, profile_dir: Optional[str] = None, task_wrapper=None):
+    """
+    Register per-request profiling and the admin profiler endpoints
+
+    Send X-Profile: 1 (or ?profile=1) together with X-Admin-Token on any API
+    request to run it under cProfile. The profile is saved to profile_dir,
+    its id is returned in X-Profile-Id, and JSON responses also get a short
+    'profile' summary. Saved profiles are only served, to admins, from
+    /api/admin/profiles/<id> (?sort=, ?limit=, ?focus=, ?format=raw).
+
+    Work the request hands to thread pools is only included when those pools
+    consult task_wrapper; work in other processes (e.g. a parse process
+    pool) never is.
+
+    Args:
+        app: Flask application
+        profile_dir: Directory for saved .prof files; must not be publicly
+            served (default: <instance path>/profiles)
+        task_wrapper: Optional ContextVar that thread-pool submitters call
+            work through (e.g. scrape.task_wrapper); while a request is
+            profiled it is set to profile the pool threads too, and their
+            stats are merged into the request's profile
+    """
+    if profile_dir is None:
+        profile_dir = os.path.join(app.instance_path, 'profiles')
+    os.makedirs(profile_dir, exist_ok=True)
+
+    def admin_only():
+        if not _is_admin():
+            return jsonify({'error': 'Forbidden'}), 403
+        return None
+
+    @app.before_request
+    def _start_profile():
+        wanted = request.headers.get('X-Profile') or request.args.get('profile')
+        if wanted and wanted not in ('0', 'false') and _is_admin():
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one active profiler per process; serve unprofiled
+                g.profile_skipped = True
+                return
+            g.profiler = profiler
+            if task_wrapper is not None:
+                g.worker_profiles = []
+                g.task_wrapper_token = task_wrapper.set(partial(profiled_call, g.worker_profiles))
+
+    @app.after_request
+    def _finish_profile(response):
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            if g.pop('profile_skipped', False):
+                response.headers['X-Profile-Skipped'] = 'another profile is in progress'
+            return response
+        profiler.disable()
+        token = g.pop('task_wrapper_token', None)
+        if token is not None:
+            task_wrapper.reset(token)
+
+        profile_id = uuid.uuid4().hex[:16]
+        path = os.path.join(profile_dir, f"{profile_id}.prof")
+        stats = pstats.Stats(profiler)
+        # Copy first: abandoned pool threads may still be finishing
+        for worker_profile in list(g.pop('worker_profiles', ())):
+            stats.add(worker_profile)
+        stats.dump_stats(path)
+        response.headers['X-Profile-Id'] = profile_id
+
+        if response.is_json:
+            payload = response.get_json(silent=True)
+            if isinstance(payload, dict):
+                payload['profile'] = {
+                    'id': profile_id,
+                    'url': f"/api/admin/profiles/{profile_id}",
+                    'summary': format_stats(path, limit=15),
+                }
+                response.set_data(app.json.dumps(payload))
+        return response
+
+    @app.route('/api/admin/profiles/<profile_id>', methods=['GET'])
+    def api_admin_profile(profile_id):
+        """Fetch a saved request profile as text (or raw .prof)"""
+        denied = admin_only()
+        if denied:
+            return denied
+        if not profile_id.isalnum():
+            return jsonify({'error': 'Invalid profile id'}), 400
+        path = os.path.join(profile_dir, f"{profile_id}.prof")
+        if not os.path.exists(path):
+            return jsonify({'error': 'Profile not found'}), 404
+
+        if request.args.get('format') == 'raw':
+            with open(path, 'rb') as f:
+                return Response(f.read(), mimetype='application/octet-stream', headers={
+                    'Content-Disposition': f'attachment; filename={profile_id}.prof'
+                })
+        try:
+            limit = _positive_int_arg('limit', 40)
+        except ValueError:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        text = format_stats(path, sort=request.args.get('sort', 'cumulative'), limit=limit,
+                            focus=request.args.get('focus'))
+        return Response(text, mimetype='text/plain')
+
+    @app.route('/api/admin/sampler', methods=['GET'])
+    def api_admin_sampler():
+        """Folded stacks collected by the sampling profiler"""
+        denied = admin_only()
+        if denied:
+            return denied
+        try:
+            limit = _positive_int_arg('limit')
+        except ValueError:
+            return jsonify({'error': 'limit must be a positive integer'}), 400
+        return Response(sampler.folded(limit), mimetype='text/plain', headers={
+            'X-Sampler-Running': str(sampler.running).lower(),
+            'X-Sample-Count': str(sampler.sample_count),
+        })
+
+    @app.route('/api/admin/sampler/start', methods=['POST'])
+    def api_admin_sampler_start():
+        """Start continuous sampling"""
+        denied = admin_only()
+        if denied:
+            return denied
+        data = request.get_json(silent=True) or {}
+        interval = None
+        if data.get('interval') is not None:
+            try:
+                interval = float(data['interval'])
+            except (TypeError, ValueError):
+                interval = math.nan
+            if not math.isfinite(interval) or interval <= 0:
+                return jsonify({'error': 'interval must be a positive number of seconds'}), 400
+            interval = min(max(interval, MIN_SAMPLER_INTERVAL), MAX_SAMPLER_INTERVAL)
+        if data.get('reset'):
+            sampler.reset()
+        sampler.start(interval)
+        return jsonify({'success': True, 'running': True, 'interval': sampler.interval})
+
+    @app.route('/api/admin/sampler/stop', methods=['POST'])
+    def api_admin_sampler_stop():
+        """Stop continuous sampling (samples are kept)"""
+        denied = admin_only()
+        if denied:
+            return denied
+        sampler.stop()
+        return jsonify({'success': True, 'running': False, 'samples': sampler.sample_count})
+
+    @app.route('/api/admin/sampler/reset', methods=['POST'])
+    def api_admin_sampler_reset():
+        """Discard collected samples"""
+        denied = admin_only()
+        if denied:
+            return denied
+        sampler.reset()
+        return jsonify({'success': True})
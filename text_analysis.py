@@ -0,0 +1,290 @@
+"""
+Text analysis for search results
+BM25 re-ranking of results against their query, and topic clustering of
+result sets with TF-IDF vectors and spherical k-means. Both work on sparse
+document-term matrices, so they take milliseconds for hundreds of results
+and scale to tens of thousands.
+
+Requires numpy and scipy (pip install numpy scipy).
+"""
+
+import re
+from itertools import chain, count, repeat
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+TOKEN_PATTERN = re.compile(r'\w\w+', re.UNICODE)
+
+# Characters of scraped page text used per document; keeps tokenizing bounded on huge pages
+MAX_DOC_CHARS = 50000
+
+# Left out of TF-IDF vectors so they don't dominate clusters and labels
+STOP_WORDS = frozenset("""
+about above after again all also am an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here
+hers him his how if in into is it its just me more most my no nor not now of off on once only or other
+our out over own same she should so some such than that the their them then there these they this those
+through to too under until up very was we were what when where which while who whom why will with would
+you your www com http https html
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased word tokens of two or more characters"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def result_text(result: Dict, include_page: bool = True) -> str:
+    """
+    Searchable text of a result: title, snippet (or news body) and, when
+    available, the scraped page description and text
+    """
+    parts = [result.get('title', ''), result.get('snippet', '') or result.get('body', '')]
+    page = result.get('page_content')
+    if include_page and isinstance(page, dict):
+        parts.append(page.get('description', ''))
+        parts.append(page.get('text_content', '')[:MAX_DOC_CHARS])
+    return ' '.join(part for part in parts if part)
+
+
+def _count_terms(docs: Sequence[str], vocabulary: Dict[str, int], grow: bool
+                 ) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """Term-count CSR matrix over vocabulary plus the token length of every document"""
+    token_lists = list(map(tokenize, docs))
+    lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(docs))
+    tokens = list(chain.from_iterable(token_lists))
+    # Vocabulary lookups go through dict/map builtins, keeping the per-token loop in C
+    if grow:
+        new_terms = [term for term in dict.fromkeys(tokens) if term not in vocabulary]
+        vocabulary.update(zip(new_terms, count(len(vocabulary))))
+    columns = np.fromiter(map(vocabulary.get, tokens, repeat(-1)), dtype=np.int64, count=len(tokens))
+    rows = np.repeat(np.arange(len(docs)), lengths)
+    known = columns >= 0
+    matrix = sparse.csr_matrix((np.ones(int(known.sum())), (rows[known], columns[known])),
+                               shape=(len(docs), len(vocabulary)))
+    # Repeated (row, term) entries are summed into counts
+    matrix.sum_duplicates()
+    return matrix, lengths
+
+
+def term_matrix(docs: Sequence[str], vocabulary: Optional[Dict[str, int]] = None
+                ) -> Tuple[sparse.csr_matrix, Dict[str, int]]:
+    """
+    Count terms per document
+
+    Args:
+        docs: Document texts
+        vocabulary: Optional fixed term -> column mapping; other terms are
+            ignored. Built from docs when omitted.
+
+    Returns:
+        (CSR matrix of shape (len(docs), len(vocabulary)) with term counts,
+        vocabulary)
+    """
+    grow = vocabulary is None
+    if grow:
+        vocabulary = {}
+    matrix, _ = _count_terms(docs, vocabulary, grow)
+    return matrix, vocabulary
+
+
+def bm25_scores(query: str, docs: Sequence[str], k1: float = 1.5, b: float = 0.75) -> np.ndarray:
+    """
+    Okapi BM25 score of every document for a query
+
+    Args:
+        query: Query text
+        docs: Document texts
+        k1: Term frequency saturation
+        b: Document length normalization (0 = none, 1 = full)
+
+    Returns:
+        float64 array of scores, one per document
+    """
+    query_terms = {term: column for column, term in enumerate(dict.fromkeys(tokenize(query)))}
+    if not len(docs) or not query_terms:
+        return np.zeros(len(docs))
+
+    # Only query terms need columns; document lengths still count every token
+    tf, doc_lengths = _count_terms(docs, query_terms, grow=False)
+    average_length = doc_lengths.mean() or 1.0
+    document_frequency = np.bincount(tf.indices, minlength=len(query_terms))
+    idf = np.log1p((len(docs) - document_frequency + 0.5) / (document_frequency + 0.5))
+
+    # Score only the stored (non-zero) entries, then sum per row
+    rows = np.repeat(np.arange(len(docs)), np.diff(tf.indptr))
+    norm = k1 * (1.0 - b + b * doc_lengths[rows] / average_length)
+    weighted = idf[tf.indices] * tf.data * (k1 + 1.0) / (tf.data + norm)
+    return np.bincount(rows, weights=weighted, minlength=len(docs))
+
+
+def rerank(results: List[Dict], query: str, include_page: bool = True) -> List[Dict]:
+    """
+    Order results by BM25 relevance to the query
+
+    Each result gets a 'bm25_score'; ties keep their original order.
+
+    Args:
+        results: Result dictionaries (text, news, or deep-scraped)
+        query: Query the results were returned for
+        include_page: Also score scraped page text when present
+
+    Returns:
+        New list of the same result dictionaries, best first
+    """
+    scores = bm25_scores(query, [result_text(result, include_page) for result in results])
+    for result, score in zip(results, scores):
+        result['bm25_score'] = round(float(score), 4)
+    order = np.argsort(-scores, kind='stable')
+    return [results[i] for i in order]
+
+
+def tfidf_matrix(docs: Sequence[str], max_df: float = 0.5, min_df: int = 1
+                 ) -> Tuple[sparse.csr_matrix, List[str]]:
+    """
+    L2-normalized TF-IDF vectors with sublinear (log) term frequency
+
+    Args:
+        docs: Document texts
+        max_df: Drop terms found in more than this fraction of documents
+            (ignored for fewer than 10 documents)
+        min_df: Drop terms found in fewer documents than this
+
+    Returns:
+        (CSR matrix with one row per document, term of every column)
+    """
+    counts, vocabulary = term_matrix(docs)
+    document_frequency = np.bincount(counts.indices, minlength=counts.shape[1])
+    keep = document_frequency >= min_df
+    if len(docs) >= 10:
+        keep &= document_frequency <= max_df * len(docs)
+    terms = np.array(list(vocabulary), dtype=object)
+    keep &= ~np.fromiter((term in STOP_WORDS or term.isdigit() for term in terms), dtype=bool, count=len(terms))
+
+    columns = np.flatnonzero(keep)
+    matrix = counts[:, columns].tocsr()
+    idf = np.log((1.0 + len(docs)) / (1.0 + document_frequency[columns])) + 1.0
+    matrix.data = np.log1p(matrix.data) * idf[matrix.indices]
+
+    norms = np.sqrt(np.bincount(np.repeat(np.arange(len(docs)), np.diff(matrix.indptr)),
+                                weights=matrix.data ** 2, minlength=len(docs)))
+    norms[norms == 0] = 1.0
+    matrix.data /= np.repeat(norms, np.diff(matrix.indptr))
+    return matrix, terms[columns].tolist()
+
+
+def spherical_kmeans(vectors: sparse.csr_matrix, num_clusters: int, max_iter: int = 30,
+                     seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Cluster unit-length rows by cosine similarity
+
+    Centers are seeded with k-means++ and refined by alternating
+    assignments (one sparse-dense product per iteration) and re-normalized
+    mean vectors. An empty cluster is re-seeded with the worst-fitting row.
+
+    Args:
+        vectors: L2-normalized rows, e.g. from tfidf_matrix()
+        num_clusters: Number of clusters (capped at the number of rows)
+        max_iter: Iteration limit; stops earlier once assignments settle
+        seed: Random seed, so the same input gives the same clusters
+
+    Returns:
+        (cluster id per row, dense center matrix with one row per cluster;
+        fewer than num_clusters if there are fewer distinct rows)
+    """
+    n = vectors.shape[0]
+    num_clusters = max(1, min(num_clusters, n))
+    rng = np.random.default_rng(seed)
+
+    # k-means++ with cosine distance 1 - similarity
+    chosen = [int(rng.integers(n))]
+    best_similarity = vectors @ vectors[chosen[0]].toarray().ravel()
+    for _ in range(1, num_clusters):
+        distance = np.clip(1.0 - best_similarity, 0.0, None)
+        total = distance.sum()
+        # Every row already coincides with a center: fewer distinct topics than requested
+        if total <= 1e-9:
+            break
+        row = int(rng.choice(n, p=distance / total))
+        chosen.append(row)
+        best_similarity = np.maximum(best_similarity, vectors @ vectors[row].toarray().ravel())
+    num_clusters = len(chosen)
+    centers = vectors[chosen].toarray()
+
+    labels = np.full(n, -1)
+    for _ in range(max_iter):
+        similarity = vectors @ np.ascontiguousarray(centers.T)
+        new_labels = similarity.argmax(axis=1)
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        sizes = np.bincount(labels, minlength=num_clusters)
+        for empty in np.flatnonzero(sizes == 0):
+            worst = int(similarity[np.arange(n), labels].argmin())
+            sizes[labels[worst]] -= 1
+            labels[worst] = empty
+            sizes[empty] = 1
+            similarity[worst] = np.inf
+
+        membership = sparse.csr_matrix((np.ones(n), (labels, np.arange(n))), shape=(num_clusters, n))
+        centers = np.asarray((membership @ vectors).todense())
+        norms = np.linalg.norm(centers, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        centers /= norms
+    return labels, centers
+
+
+def default_cluster_count(n: int) -> int:
+    """Rule-of-thumb cluster count: sqrt(n / 2), between 1 and 50"""
+    return int(min(50, max(1, round((n / 2) ** 0.5))))
+
+
+def cluster_results(results: List[Dict], num_clusters: Optional[int] = None, label_terms: int = 3,
+                    include_page: bool = True, seed: int = 0) -> List[Dict]:
+    """
+    Group results into topics
+
+    Args:
+        results: Result dictionaries (any search kind, deep-scraped or not)
+        num_clusters: Number of topics; default_cluster_count() when omitted
+        label_terms: Top centroid terms used for each label
+        include_page: Also use scraped page text when present
+        seed: Random seed for the clustering
+
+    Returns:
+        Clusters, largest first, as {'id', 'label', 'terms', 'size',
+        'indices'} dictionaries; indices point into results, ordered by
+        similarity to the cluster center
+    """
+    if not results:
+        return []
+    vectors, terms = tfidf_matrix([result_text(result, include_page) for result in results])
+    if num_clusters is None:
+        num_clusters = default_cluster_count(len(results))
+    if not terms:
+        return [{'id': 0, 'label': '', 'terms': [], 'size': len(results), 'indices': list(range(len(results)))}]
+    labels, centers = spherical_kmeans(vectors, num_clusters, seed=seed)
+
+    similarity = np.asarray((vectors @ centers.T))[np.arange(len(results)), labels]
+    order = np.lexsort((-similarity, labels))
+    bounds = np.searchsorted(labels[order], np.arange(len(centers) + 1))
+    term_array = np.array(terms, dtype=object)
+    clusters = []
+    for cluster in range(len(centers)):
+        members = order[bounds[cluster]:bounds[cluster + 1]]
+        if not len(members):
+            continue
+        top = np.argsort(-centers[cluster])[:label_terms]
+        top_terms = [term for term, weight in zip(term_array[top], centers[cluster][top]) if weight > 0]
+        clusters.append({
+            'id': cluster,
+            'label': ' / '.join(top_terms),
+            'terms': top_terms,
+            'size': len(members),
+            'indices': members.tolist(),
+        })
+    clusters.sort(key=lambda cluster: -cluster['size'])
+    return clusters
@@ -0,0 +1,267 @@
+"""
+Watch queries for DuckDuckGo Scraper
+Re-runs registered searches on an interval and emits only new or changed results
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from scrape import DuckDuckGoScraper
+
+logger = logging.getLogger(__name__)
+
+# Fingerprints kept per watch; the oldest URLs are forgotten first
+MAX_FINGERPRINTS = 1000
+# Change records kept per watch for /changes polling
+MAX_CHANGES = 500
+
+
+def content_hash(result: Dict) -> str:
+    """Short hash of the fields that make a result 'changed'"""
+    parts = [str(result.get(field, '')) for field in ('title', 'snippet', 'date', 'published')]
+    return hashlib.sha1('\x1f'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def diff_results(fingerprints: Dict[str, str], results: List[Dict]) -> List[Dict]:
+    """
+    Compare a result set against stored fingerprints
+
+    Args:
+        fingerprints: url -> content hash from the previous run (updated in place)
+        results: Fresh result dictionaries
+
+    Returns:
+        List of {'change': 'new'|'changed', 'url', 'hash', 'result'} records
+    """
+    changes = []
+    for result in results:
+        url = result.get('url', '')
+        if not url:
+            continue
+        digest = content_hash(result)
+        previous = fingerprints.pop(url, None)
+        # Re-insert so the dict stays ordered by last sighting
+        fingerprints[url] = digest
+        if previous is None:
+            changes.append({'change': 'new', 'url': url, 'hash': digest, 'result': result})
+        elif previous != digest:
+            changes.append({'change': 'changed', 'url': url, 'hash': digest, 'result': result})
+
+    while len(fingerprints) > MAX_FINGERPRINTS:
+        fingerprints.pop(next(iter(fingerprints)))
+    return changes
+
+
+class WatchStore:
+    """Registered watches, their fingerprints and recent changes, persisted to a JSON file"""
+
+    def __init__(self, path: str = 'watches.json'):
+        self.path = path
+        self.lock = threading.RLock()
+        self.watches = {}
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.watches = json.load(f)
+
+    def save(self):
+        """Write all watches to disk atomically"""
+        with self.lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.watches, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+
+    def add(self, query: str, kind: str = 'news', region: str = 'us-en',
+            max_results: int = 20, interval: float = 300) -> Dict:
+        """Register a new watch"""
+        if kind not in ('text', 'news', 'videos', 'images'):
+            raise ValueError(f"Unknown search kind: {kind}")
+        watch = {
+            'id': secrets.token_hex(6),
+            'query': query,
+            'kind': kind,
+            'region': region,
+            'max_results': max_results,
+            'interval': interval,
+            'created': time.time(),
+            'last_run': None,
+            'runs': 0,
+            'seq': 0,
+            'fingerprints': {},
+            'changes': [],
+        }
+        with self.lock:
+            self.watches[watch['id']] = watch
+            self.save()
+        return watch
+
+    def remove(self, watch_id: str) -> bool:
+        """Delete a watch; returns False if it did not exist"""
+        with self.lock:
+            if self.watches.pop(watch_id, None) is None:
+                return False
+            self.save()
+            return True
+
+    def get(self, watch_id: str) -> Optional[Dict]:
+        with self.lock:
+            return self.watches.get(watch_id)
+
+    def summary(self, watch: Dict) -> Dict:
+        """Public view of a watch, without fingerprints and change records"""
+        return {key: value for key, value in watch.items() if key not in ('fingerprints', 'changes')}
+
+    def changes_since(self, watch_id: str, since: int = 0) -> List[Dict]:
+        """Change records with a sequence number greater than since"""
+        with self.lock:
+            watch = self.watches.get(watch_id)
+            if watch is None:
+                raise KeyError(watch_id)
+            return [change for change in watch['changes'] if change['seq'] > since]
+
+
+class WatchScheduler:
+    """Runs due watches in a background thread and reports their deltas"""
+
+    def __init__(self, scraper: DuckDuckGoScraper, store: WatchStore,
+                 on_changes: Optional[Callable[[Dict, List[Dict]], None]] = None, tick: float = 1.0):
+        """
+        Args:
+            scraper: Scraper used to run the searches
+            store: Watch registry
+            on_changes: Optional callback(watch, changes) for non-empty deltas
+            tick: Seconds between checks for due watches
+        """
+        self.scraper = scraper
+        self.store = store
+        self.on_changes = on_changes
+        self.tick = tick
+        self._thread = None
+        self._stop = threading.Event()
+
+    def run_watch(self, watch: Dict) -> List[Dict]:
+        """
+        Run one watch now and record its delta
+
+        The first run only records a baseline, so it reports no changes.
+        An empty result set is treated as an upstream failure and ignored.
+        """
+        results = self.scraper.search_kind(watch['kind'], watch['query'],
+                                           max_results=watch['max_results'], region=watch['region'])
+        with self.store.lock:
+            watch['last_run'] = time.time()
+            watch['runs'] += 1
+            if not results:
+                self.store.save()
+                return []
+
+            baseline = not watch['fingerprints']
+            changes = diff_results(watch['fingerprints'], results)
+            if baseline:
+                changes = []
+            for change in changes:
+                watch['seq'] += 1
+                change['seq'] = watch['seq']
+                change['time'] = watch['last_run']
+            watch['changes'] = (watch['changes'] + changes)[-MAX_CHANGES:]
+            self.store.save()
+
+        if changes and self.on_changes:
+            self.on_changes(watch, changes)
+        return changes
+
+    def run_due(self) -> Dict[str, List[Dict]]:
+        """Run every watch whose interval has elapsed; returns changes per watch id"""
+        now = time.time()
+        deltas = {}
+        with self.store.lock:
+            watches = list(self.store.watches.values())
+        for watch in watches:
+            if watch['last_run'] is None or now - watch['last_run'] >= watch['interval']:
+                try:
+                    deltas[watch['id']] = self.run_watch(watch)
+                except Exception as e:
+                    logger.exception("Watch %s failed: %s", watch['id'], e)
+        return deltas
+
+    def start(self):
+        """Start checking for due watches in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='watch-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_due()
+            self._stop.wait(self.tick)
+
+
+def print_changes(watch: Dict, changes: List[Dict]):
+    """Write changes to stdout as NDJSON"""
+    for change in changes:
+        print(json.dumps({'watch': watch['id'], 'query': watch['query'], **change}, ensure_ascii=False))
+    sys.stdout.flush()
+
+
+def main():
+    """Command line interface for managing and running watches"""
+    parser = argparse.ArgumentParser(description='Watch DuckDuckGo queries for new or changed results')
+    parser.add_argument('--file', default=os.environ.get('WATCH_FILE', 'watches.json'),
+                        help='Watch store file (default: $WATCH_FILE or watches.json)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='Register a query')
+    add.add_argument('query')
+    add.add_argument('--type', dest='kind', default='news', choices=['text', 'news', 'videos', 'images'])
+    add.add_argument('--region', default='us-en')
+    add.add_argument('--max-results', type=int, default=20)
+    add.add_argument('--interval', type=float, default=300, help='Seconds between runs (default: 300)')
+
+    commands.add_parser('list', help='List registered queries')
+    remove = commands.add_parser('remove', help='Unregister a query')
+    remove.add_argument('id')
+    commands.add_parser('once', help='Run due queries once and print their changes as NDJSON')
+    commands.add_parser('run', help='Keep running queries on their intervals, printing changes as NDJSON')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    store = WatchStore(args.file)
+
+    if args.command == 'add':
+        watch = store.add(args.query, kind=args.kind, region=args.region,
+                          max_results=args.max_results, interval=args.interval)
+        print(json.dumps(store.summary(watch)))
+    elif args.command == 'list':
+        for watch in store.watches.values():
+            print(json.dumps(store.summary(watch)))
+    elif args.command == 'remove':
+        if not store.remove(args.id):
+            sys.exit(f"No watch with id {args.id}")
+    else:
+        scheduler = WatchScheduler(DuckDuckGoScraper(), store, on_changes=print_changes)
+        if args.command == 'once':
+            scheduler.run_due()
+        else:
+            try:
+                scheduler._run()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == '__main__':
+    main()